@@ -0,0 +1,206 @@
+"""
+Rendering benchmarks.
+
+    python benchmark.py profiles [FILE.pdf] [--pages N] [--zoom F]
+    python benchmark.py zoom [FILE.pdf] [--steps N]
+    python benchmark.py colors [FILE.pdf] [--width PX]
+    python benchmark.py stall [FILE.pdf] [--zoom F]
+
+Without a file a synthetic document is generated in a temp folder: vector-heavy
+CAD-like pages for "profiles", "colors" and "stall", a map-like page of many
+small paths and labels for "zoom".
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import fitz
+
+from page_colors import MODES, NORMAL, SEPIA_COLORS, custom_mode, transform_pnm
+from pdf_miner import PDFMiner, RenderProcess, PROFILES, FITZ_LOCK
+
+def make_vector_pdf(path, pages=3, lines=20000):
+    """Write a CAD-like test document with many thin vector strokes per page."""
+    doc = fitz.open()
+    for pno in range(pages):
+        page = doc.new_page(width=1191, height=842)  # A3 landscape
+        shape = page.new_shape()
+        for i in range(lines):
+            x = (i * 37 + pno * 11) % 1191
+            y = (i * 53) % 842
+            shape.draw_line((x, y), ((x + 97) % 1191, (y + 61) % 842))
+        shape.finish(width=0.3, color=(0, 0, 0))
+        shape.commit()
+    doc.save(path)
+    doc.close()
+    return path
+
+def make_map_pdf(path, segments=60000, labels=3000):
+    """Write a map-like test page whose content stream is expensive to interpret."""
+    doc = fitz.open()
+    page = doc.new_page(width=1191, height=842)
+    shape = page.new_shape()
+    for i in range(segments):
+        x, y = (i * 37) % 1191, (i * 53) % 842
+        shape.draw_line((x, y), (x + 1.5, y + 1))
+    shape.finish(width=0.2, color=(0.2, 0.3, 0.2))
+    shape.commit()
+    for i in range(labels):
+        page.insert_text(((i * 71) % 1150, (i * 29) % 830 + 10), f"lbl{i}", fontsize=3)
+    doc.save(path)
+    doc.close()
+    return path
+
+def _timed(fn, repeat):
+    """Return per-call timings in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def bench_profiles(path, pages=3, zoom=1.0, repeat=3):
+    """Time uncached page renders for every quality profile."""
+    miner = PDFMiner(path, cache_bytes=0)
+    pages = min(pages, miner.pages)
+    rows = []
+    for profile in PROFILES:
+        samples = []
+        for pno in range(pages):
+            samples += _timed(lambda: miner.pixmap(pno, zoom, profile), repeat)
+        pix = miner.pixmap(0, zoom, profile)
+        rows.append((profile, statistics.median(samples), max(samples), f"{pix.width}x{pix.height}"))
+    miner.close()
+
+    print(f"{os.path.basename(path)}: {pages} page(s), zoom {zoom}, {repeat} run(s) each")
+    print(f"{'profile':<12}{'median ms':>12}{'max ms':>10}  raster")
+    for profile, median, worst, size in rows:
+        print(f"{profile:<12}{median:>12.1f}{worst:>10.1f}  {size}")
+    return rows
+
+def bench_zoom(path, steps=8, pno=0, repeat=3):
+    """Zoom in and back out on one page, with and without the display-list cache."""
+    factors = [1.1 ** i for i in range(steps)]
+    factors += factors[-2::-1]
+
+    miner = PDFMiner(path, cache_bytes=0)
+    base = miner.base_zoom
+
+    def direct():
+        for f in factors:
+            with FITZ_LOCK:
+                miner.doc[pno].get_pixmap(matrix=fitz.Matrix(base * f, base * f))
+
+    def display_list():
+        for f in factors:
+            miner.pixmap(pno, f)
+
+    # Alternate the two variants so allocator and cache warm-up affect both equally.
+    direct_runs, display_list_runs = [], []
+    for _ in range(repeat):
+        direct_runs += _timed(direct, 1)
+        display_list_runs += _timed(display_list, 1)
+    direct_ms = statistics.median(direct_runs)
+    display_list_ms = statistics.median(display_list_runs)
+    miner.close()
+
+    print(f"{os.path.basename(path)}: page {pno + 1}, {len(factors)} zoom steps, "
+          f"median of {repeat} sweeps")
+    print(f"{'re-parse every step':<24}{direct_ms:>10.0f} ms")
+    print(f"{'display-list replay':<24}{display_list_ms:>10.0f} ms")
+    return direct_ms, display_list_ms
+
+def bench_colors(path, width=1920, pno=0, repeat=3):
+    """Compare a page rasterization with re-tinting it in every page colour mode."""
+    miner = PDFMiner(path, cache_bytes=0)
+    factor = width / miner.pixmap(pno, 1.0).width
+    raster = statistics.median(_timed(lambda: miner.render(pno, factor), repeat))
+    ppm = miner.render(pno, factor)
+    pix = miner.pixmap(pno, factor)
+    miner.close()
+
+    modes = [m for m in MODES if m != NORMAL] + [custom_mode(*reversed(SEPIA_COLORS))]
+    print(f"{os.path.basename(path)}: page {pno + 1} at {pix.width}x{pix.height}, "
+          f"median of {repeat} run(s)")
+    print(f"{'rasterize':<24}{raster:>10.1f} ms")
+    rows = []
+    for mode in modes:
+        ms = statistics.median(_timed(lambda: transform_pnm(ppm, mode), max(repeat, 10)))
+        rows.append((mode, ms))
+        print(f"{mode.split(':')[0]:<24}{ms:>10.1f} ms")
+    return raster, rows
+
+def _main_thread_stall(render):
+    """Run render() on a worker thread; return (render ms, longest main-thread gap ms).
+
+    The main thread ticks every millisecond, like a Tk loop that has nothing to
+    do, so the longest gap is how long the UI would have been frozen.
+    """
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: (render(), done.set()))
+    start = last = time.perf_counter()
+    worker.start()
+    worst = 0.0
+    while not done.is_set():
+        time.sleep(0.001)
+        now = time.perf_counter()
+        worst, last = max(worst, now - last), now
+    worker.join()
+    return (time.perf_counter() - start) * 1000, worst * 1000
+
+def bench_stall(path, zoom=1.0, pno=0, repeat=3):
+    """Compare UI-thread stalls while a page renders on a thread vs. in a render process."""
+    renderer = RenderProcess(1)
+    renderer.start()
+    variants = [("worker thread", PDFMiner(path, cache_bytes=0)),
+                ("render process", PDFMiner(path, cache_bytes=0, renderer=renderer))]
+    variants[1][1].render(pno, 0.1)  # let the process start and parse the document
+
+    rows = []
+    for label, miner in variants:
+        runs = [_main_thread_stall(lambda: miner.render(pno, zoom)) for _ in range(repeat)]
+        rows.append((label, statistics.median(r[0] for r in runs), max(r[1] for r in runs)))
+        miner.close()
+    renderer.shutdown()
+
+    print(f"{os.path.basename(path)}: page {pno + 1}, zoom {zoom}, {repeat} run(s)")
+    print(f"{'render on':<16}{'median ms':>12}{'worst UI stall ms':>20}")
+    for label, ms, stall in rows:
+        print(f"{label:<16}{ms:>12.0f}{stall:>20.1f}")
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF Viewer rendering benchmarks")
+    parser.add_argument("suite", choices=["profiles", "zoom", "colors", "stall"])
+    parser.add_argument("file", nargs="?")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--zoom", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1920, help="raster width for colors")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.gettempdir()
+    if args.file:
+        path = args.file
+    elif args.suite == "zoom":
+        path = make_map_pdf(os.path.join(tmp, "bench_map.pdf"))
+    else:
+        path = make_vector_pdf(os.path.join(tmp, "bench_vector.pdf"), args.pages)
+
+    if args.suite == "profiles":
+        bench_profiles(path, args.pages, args.zoom, args.repeat)
+    elif args.suite == "zoom":
+        bench_zoom(path, args.steps, repeat=args.repeat)
+    elif args.suite == "colors":
+        bench_colors(path, args.width, repeat=args.repeat)
+    else:
+        bench_stall(path, args.zoom, repeat=args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,11 @@
 Custom dialog boxes and user input forms.
 """
 
+import os
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+
+from task_executor import CancelToken, PRIORITY_BACKGROUND
 
 class PasswordDialog:
     """Custom password dialog with confirmation field."""
@@ -85,3 +88,162 @@ class PasswordDialog:
         dialog.wait_window()
         
         return result["password"]
+
+class ProgressDialog:
+    """Small non-modal progress window with a Cancel button bound to a CancelToken."""
+    
+    def __init__(self, parent, title, token):
+        self.token = token
+        self.top = tk.Toplevel(parent)
+        self.top.title(title)
+        self.top.geometry("360x110")
+        self.top.transient(parent)
+        self.top.resizable(False, False)
+        
+        self.bar = ttk.Progressbar(self.top, mode="determinate", length=320)
+        self.bar.pack(pady=(15, 5), padx=20)
+        self.label = ttk.Label(self.top, text="Starting...")
+        self.label.pack()
+        ttk.Button(self.top, text="Cancel", command=self.cancel).pack(pady=8)
+        self.top.protocol("WM_DELETE_WINDOW", self.cancel)
+    
+    def update(self, done, total):
+        """Show progress; safe to call after the window was closed."""
+        if self.top.winfo_exists():
+            self.bar.configure(maximum=max(total, 1), value=done)
+            self.label.config(text=f"{done} / {total}")
+    
+    def cancel(self):
+        self.token.cancel()
+        self.close()
+    
+    def close(self):
+        if self.top.winfo_exists():
+            self.top.destroy()
+
+class LibrarySearchDialog:
+    """Non-modal search panel over the full-text library index."""
+    
+    def __init__(self, parent, library, executor, on_open):
+        self.library = library
+        self.executor = executor
+        self.on_open = on_open
+        self.token = None
+        
+        # Create the panel window
+        self.top = tk.Toplevel(parent)
+        self.top.title("Library Search")
+        self.top.geometry("800x500")
+        self.top.transient(parent)
+        self.top.columnconfigure(0, weight=1)
+        self.top.rowconfigure(1, weight=1)
+        
+        # Search row
+        bar = ttk.Frame(self.top)
+        bar.grid(row=0, column=0, sticky="ew", padx=8, pady=8)
+        bar.columnconfigure(0, weight=1)
+        self.query = tk.StringVar()
+        entry = ttk.Entry(bar, textvariable=self.query)
+        entry.grid(row=0, column=0, sticky="ew")
+        entry.bind('<Return>', lambda e: self.search())
+        ttk.Button(bar, text="Search", command=self.search).grid(row=0, column=1, padx=(6, 0))
+        
+        # Results
+        self.results = ttk.Treeview(self.top, columns=("file", "page", "match"), show="headings")
+        for col, text, width in (("file", "File", 200), ("page", "Page", 50), ("match", "Match", 500)):
+            self.results.heading(col, text=text)
+            self.results.column(col, width=width, stretch=(col == "match"))
+        self.results.grid(row=1, column=0, sticky="nsew", padx=8)
+        self.results.bind('<Double-1>', self._open_selected)
+        self.results.bind('<Return>', self._open_selected)
+        self.hits = {}
+        
+        # Folder management and status
+        foot = ttk.Frame(self.top)
+        foot.grid(row=2, column=0, sticky="ew", padx=8, pady=8)
+        ttk.Button(foot, text="Add Folder...", command=self.add_folder).pack(side="left")
+        ttk.Button(foot, text="Remove Folder...", command=self.remove_folder).pack(side="left", padx=6)
+        ttk.Button(foot, text="Re-index Now", command=self.reindex).pack(side="left")
+        self.status = ttk.Label(foot, text="")
+        self.status.pack(side="right")
+        
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+        entry.focus()
+        self._set_status_from_stats()
+    
+    def _set_status(self, text):
+        # Background results may arrive after the panel was closed.
+        if self.top.winfo_exists():
+            self.status.config(text=text)
+    
+    def _set_status_from_stats(self):
+        self.executor.submit(self.library.stats, on_done=lambda s: self._set_status(
+            f"{s['files']} files, {s['pages']} pages indexed"))
+    
+    def search(self):
+        """Run the query in the background and list the hits."""
+        query = self.query.get().strip()
+        if not query:
+            return
+        self._set_status("Searching...")
+        self.executor.submit(self.library.search, query, on_done=self._show_results)
+    
+    def _show_results(self, rows):
+        if not self.top.winfo_exists():
+            return
+        self.results.delete(*self.results.get_children())
+        self.hits = {}
+        for path, page, snippet in rows:
+            iid = self.results.insert("", "end", values=(os.path.basename(path), page + 1,
+                                                         " ".join(snippet.split())))
+            self.hits[iid] = (path, page)
+        self._set_status(f"{len(rows)} match(es)")
+    
+    def _open_selected(self, event=None):
+        for iid in self.results.selection():
+            path, page = self.hits[iid]
+            self.on_open(path, page=page)
+    
+    def add_folder(self):
+        folder = filedialog.askdirectory(parent=self.top, title="Add folder to library")
+        if folder:
+            # SQLite may wait on a running update, so stay off the Tk thread.
+            self.executor.submit(self.library.add_folder, folder, on_done=lambda _: self.reindex())
+    
+    def remove_folder(self):
+        self.executor.submit(self.library.folders, on_done=self._ask_remove_folder)
+    
+    def _ask_remove_folder(self, folders):
+        if not self.top.winfo_exists():
+            return
+        if not folders:
+            messagebox.showinfo("Library", "No folders in the library.", parent=self.top)
+            return
+        folder = filedialog.askdirectory(parent=self.top, title="Remove folder from library",
+                                         initialdir=folders[0])
+        if folder and os.path.abspath(folder) in folders:
+            self.executor.submit(self.library.remove_folder, folder,
+                                 on_done=lambda _: self._set_status_from_stats())
+    
+    def reindex(self):
+        """Update the index in the background, reporting progress."""
+        if self.token:
+            self.token.cancel()
+        self._set_status("Indexing...")
+        
+        def progress(done, total):
+            self.executor.call_in_ui(self._set_status, f"Indexing {done}/{total}...")
+        
+        def done(counts):
+            self._set_status("{added} added, {updated} updated, {removed} removed, "
+                             "{unchanged} unchanged".format(**counts))
+        
+        # submit() keeps token= for itself, so hand it to update() explicitly.
+        token = self.token = CancelToken()
+        self.executor.submit(lambda: self.library.update(progress=progress, token=token),
+                             token=token, priority=PRIORITY_BACKGROUND, on_done=done)
+    
+    def close(self):
+        if self.token:
+            self.token.cancel()
+        self.top.destroy()
@@ -0,0 +1,90 @@
+"""
+Reference-counted pool of open documents, so tabs showing the same file share
+one parsed handle and one render cache.
+"""
+
+import os
+import threading
+
+from pdf_miner import PDFMiner
+
+def fingerprint(path):
+    """Identify a file version by real path, size and modification time."""
+    st = os.stat(path)
+    return (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+
+class DocumentPool:
+    """Hands out shared PDFMiner handles keyed by file fingerprint."""
+
+    def __init__(self, opener=PDFMiner):
+        self.opener = opener
+        self._lock = threading.Lock()
+        self._current = {}  # real path -> entry for the file's latest version
+        self._entries = {}  # id(miner) -> entry, including superseded versions
+
+    def acquire(self, path, pwd=None):
+        """Return a shared handle for path, opening it if no tab has this version yet."""
+        fp = fingerprint(path)
+        with self._lock:
+            entry = self._current.get(fp[0])
+            if entry and entry["fingerprint"] == fp:
+                entry["refs"] += 1
+                return entry["miner"]
+
+        # Parse outside the lock; if another thread won the race, use its handle.
+        miner = self.opener(path, pwd)
+        with self._lock:
+            entry = self._current.get(fp[0])
+            if entry and entry["fingerprint"] == fp:
+                entry["refs"] += 1
+                winner = entry["miner"]
+            else:
+                entry = dict(fingerprint=fp, miner=miner, pwd=pwd, refs=1)
+                self._current[fp[0]] = entry
+                self._entries[id(miner)] = entry
+                return miner
+        miner.close()
+        return winner
+
+    def retain(self, miner):
+        """Add a reference to a handle already obtained from acquire()."""
+        with self._lock:
+            self._entries[id(miner)]["refs"] += 1
+
+    def release(self, miner):
+        """Drop a reference; the handle is closed when the last one goes away.
+
+        Handles that did not come from this pool are closed immediately.
+        """
+        with self._lock:
+            entry = self._entries.get(id(miner))
+            if entry:
+                entry["refs"] -= 1
+                if entry["refs"] > 0:
+                    return
+                del self._entries[id(miner)]
+                key = entry["fingerprint"][0]
+                if self._current.get(key) is entry:
+                    del self._current[key]
+        miner.close()
+
+    def is_stale(self, miner):
+        """True if the file behind a pooled handle has changed on disk."""
+        with self._lock:
+            entry = self._entries.get(id(miner))
+        if not entry:
+            return False
+        try:
+            return fingerprint(entry["fingerprint"][0]) != entry["fingerprint"]
+        except OSError:
+            return False  # deleted or unreadable: keep showing what we have
+
+    def reopen(self, miner):
+        """Acquire a handle for the current version of a stale handle's file."""
+        with self._lock:
+            entry = self._entries[id(miner)]
+        return self.acquire(entry["fingerprint"][0], entry["pwd"])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,186 @@
+"""
+Extraction of embedded images in their original encoding.
+
+Every image xref is written once, however many pages reuse it. JPEG, JPEG 2000
+and JBIG2 streams are written as stored; other encodings come out as PNG.
+Extraction is spread over a process pool because PyMuPDF documents cannot be
+shared between threads.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tkinter import filedialog as fd, messagebox
+
+import fitz
+
+from dialogs import ProgressDialog
+from task_executor import Cancelled, CancelToken, PRIORITY_BACKGROUND
+
+XREFS_PER_JOB = 32
+
+def collect_images(path, pwd=None, token=None):
+    """Return ({xref: first 0-based page}, total image references) for a document."""
+    first_page, refs = {}, 0
+    with fitz.open(path) as doc:
+        if doc.needs_pass and not doc.authenticate(pwd or ""):
+            raise RuntimeError("password required")
+        for pno in range(doc.page_count):
+            if token:
+                token.raise_if_cancelled()
+            for img in doc.get_page_images(pno, full=True):
+                refs += 1
+                first_page.setdefault(img[0], pno)
+    return first_page, refs
+
+def _extract_chunk(path, items, out_dir, pwd=None, min_size=0):
+    """Process-pool job: write the images for [(xref, page)] and return (written, bytes)."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    written = size = 0
+    with fitz.open(path) as doc:
+        if doc.needs_pass:
+            doc.authenticate(pwd or "")
+        for xref, pno in items:
+            info = doc.extract_image(xref)
+            if not info or min(info["width"], info["height"]) < min_size:
+                continue
+            dst = os.path.join(out_dir, f"{stem}_p{pno + 1}_x{xref}.{info['ext']}")
+            with open(dst, "wb") as f:
+                f.write(info["image"])
+            written += 1
+            size += len(info["image"])
+    return written, size
+
+def extract_images(paths, out_dir, workers=None, pwd=None, min_size=0, progress=None, token=None):
+    """Extract the unique images of one or more PDFs into out_dir.
+
+    progress(done, total) is called as unique images are processed; a CancelToken
+    stops the remaining jobs. Returns a report dict.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    report = dict(files=0, refs=0, unique=0, written=0, bytes=0, errors=[])
+    jobs = []
+    for path in paths:
+        try:
+            first_page, refs = collect_images(path, pwd, token)
+        except Cancelled:
+            raise
+        except Exception as e:
+            report["errors"].append(f"{os.path.basename(path)}: {e}")
+            continue
+        dst = out_dir if len(paths) == 1 else os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0])
+        os.makedirs(dst, exist_ok=True)
+        items = sorted(first_page.items())
+        jobs += [(path, items[i:i + XREFS_PER_JOB], dst) for i in range(0, len(items), XREFS_PER_JOB)]
+        report["files"] += 1
+        report["refs"] += refs
+        report["unique"] += len(items)
+
+    done = 0
+    # Spawned workers: forking the threaded viewer process can deadlock the child.
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(_extract_chunk, path, items, dst, pwd, min_size): (path, len(items))
+                   for path, items, dst in jobs}
+        for future in as_completed(futures):
+            if token and token.cancelled:
+                pool.shutdown(wait=False, cancel_futures=True)
+                token.raise_if_cancelled()
+            path, count = futures[future]
+            try:
+                written, size = future.result()
+                report["written"] += written
+                report["bytes"] += size
+            except Exception as e:
+                report["errors"].append(f"{os.path.basename(path)}: {e}")
+            done += count
+            if progress:
+                progress(done, report["unique"])
+    return report
+
+def format_report(report):
+    """Return a short human-readable summary of an extraction report."""
+    text = (f"Wrote {report['written']} image(s), {report['bytes'] / 1048576:,.1f} MB, "
+            f"from {report['files']} file(s).\n"
+            f"{report['refs']} image references, {report['unique']} unique.")
+    if report["errors"]:
+        text += "\n\n" + "\n".join(report["errors"][:10])
+    return text
+
+class ImageExtractor:
+    """Handles the Extract Images actions."""
+
+    def __init__(self, parent):
+        self.parent = parent
+
+    def _run(self, paths, out_dir):
+        """Extract in the background with a progress window."""
+        token = CancelToken()
+        dialog = ProgressDialog(self.parent.root, "Extracting Images", token)
+        executor = self.parent.executor
+
+        def progress(done, total):
+            executor.call_in_ui(dialog.update, done, total)
+
+        def done(report):
+            dialog.close()
+            messagebox.showinfo("Done", format_report(report))
+
+        def failed(exc):
+            dialog.close()
+            messagebox.showerror("Error", str(exc))
+
+        # submit() keeps token= for itself, so hand it to extract_images() explicitly.
+        executor.submit(lambda: extract_images(paths, out_dir, progress=progress, token=token),
+                        token=token, priority=PRIORITY_BACKGROUND, on_done=done, on_error=failed)
+
+    def extract_images(self, source_path=None):
+        """Extract the images of the current (or a chosen) PDF."""
+        src = source_path or fd.askopenfilename(title="Select PDF", filetypes=[("PDF", "*.pdf")])
+        if not src:
+            return
+        out_dir = fd.askdirectory(title="Select output folder for images")
+        if not out_dir:
+            return
+        self._run([src], out_dir)
+
+    def extract_folder(self):
+        """Extract the images of every PDF in a folder."""
+        src_dir = fd.askdirectory(title="Select folder of PDFs")
+        if not src_dir:
+            return
+        out_dir = fd.askdirectory(title="Select output folder for images")
+        if not out_dir:
+            return
+        paths = sorted(os.path.join(src_dir, n) for n in os.listdir(src_dir) if n.lower().endswith(".pdf"))
+        if not paths:
+            messagebox.showinfo("Info", "No PDFs found in that folder.")
+            return
+        self._run(paths, out_dir)
+
+def main(argv=None):
+    """Extract images from PDFs or folders of PDFs from the command line."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract embedded images from PDFs")
+    parser.add_argument("src", nargs="+", help="PDF files and/or folders")
+    parser.add_argument("-o", "--out", required=True, help="output folder")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-size", type=int, default=0, help="skip images smaller than N px")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for src in args.src:
+        if os.path.isdir(src):
+            paths += sorted(os.path.join(src, n) for n in os.listdir(src) if n.lower().endswith(".pdf"))
+        else:
+            paths.append(src)
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end="", flush=True)
+
+    report = extract_images(paths, args.out, args.workers, min_size=args.min_size, progress=progress)
+    print()
+    print(format_report(report))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Record viewer interactions and replay them headlessly for latency regression testing.
+
+    python interaction_trace.py replay TRACE.json [--realtime] [--map OLD=NEW] [--runs N]
+                                [--save RESULT.json] [--baseline RESULT.json]
+
+A replay drives the same rendering layer the viewer uses (DocumentPool + PDFMiner
+rasterizing in RenderProcess workers, with draft-then-final renders) and reports
+per-action latency percentiles and peak memory; with --runs each figure is the
+median over N replays. With --baseline it exits non-zero if any action's p95
+regressed by more than --tolerance and by at least --min-ms, ignoring actions
+with fewer than --min-count samples.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from document_pool import DocumentPool
+from pdf_miner import DEFAULT_PROFILE, DRAFT_PROFILE, PDFMiner, RenderProcess
+
+TRACE_VERSION = 1
+SETTLE_SECONDS = 0.25  # matches the viewer's SETTLE_MS
+DEFAULT_TOLERANCE = 0.20
+DEFAULT_MIN_MS = 2.0    # slowdowns below this are timer noise, whatever the ratio
+DEFAULT_MIN_COUNT = 5   # too few samples for a meaningful p95
+
+class TraceRecorder:
+    """Collects timestamped viewer actions."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.events = []
+
+    def record(self, action, **args):
+        """Append one action with its offset in seconds from the start of recording."""
+        self.events.append(dict(t=round(time.perf_counter() - self.start, 4), action=action, **args))
+
+    def save(self, path):
+        """Write the trace as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(version=TRACE_VERSION, events=self.events), f, indent=1)
+
+def load_trace(path):
+    """Read a trace written by TraceRecorder.save()."""
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(f"unsupported trace version {trace.get('version')!r}")
+    return trace["events"]
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list."""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, where the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class TraceReplayer:
+    """Replays a trace against the rendering layer and times every action."""
+
+    def __init__(self, events, path_map=None, realtime=False, draft=True, renderer=None):
+        self.events = events
+        self.path_map = path_map or {}
+        self.realtime = realtime
+        self.draft = draft
+        self.pool = DocumentPool(lambda path, pwd: PDFMiner(path, pwd, renderer=renderer))
+        self.tabs = {}
+        self.latencies = {}
+
+    def _path(self, path):
+        for old, new in self.path_map.items():
+            if path.startswith(old):
+                return new + path[len(old):]
+        return path
+
+    def _render(self, tab, settles):
+        """Render like the viewer: draft first when input keeps coming, then final."""
+        miner = tab["miner"]
+        if self.draft:
+            miner.render(tab["page"], tab["zoom"], profile=DRAFT_PROFILE)
+        if settles or not self.draft:
+            miner.render(tab["page"], tab["zoom"], profile=DEFAULT_PROFILE)
+
+    def _apply(self, event, settles):
+        action = event["action"]
+        if action == "open":
+            miner = self.pool.acquire(self._path(event["path"]))
+            tab = self.tabs[event["tab"]] = dict(miner=miner, page=event.get("page", 0), zoom=1.0)
+            miner.render(tab["page"], tab["zoom"], profile=DEFAULT_PROFILE)
+        elif action == "close":
+            self.pool.release(self.tabs.pop(event["tab"])["miner"])
+        elif action == "select":
+            tab = self.tabs[event["tab"]]
+            self.pool.is_stale(tab["miner"])
+        else:
+            tab = self.tabs[event["tab"]]
+            if action == "jump":
+                # Jumps are rendered directly in final quality, as in the viewer.
+                tab["page"] = event["page"]
+                tab["miner"].render(tab["page"], tab["zoom"], profile=DEFAULT_PROFILE)
+                return
+            if action == "shift":
+                tab["page"] += event["delta"]
+            elif action == "zoom":
+                tab["zoom"] *= event["factor"]
+            else:
+                raise ValueError(f"unknown action {action!r}")
+            self._render(tab, settles)
+
+    def run(self):
+        """Replay every event; returns the summary from report()."""
+        tracemalloc.start()
+        start = time.perf_counter()
+        for i, event in enumerate(self.events):
+            if self.realtime:
+                delay = event["t"] - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            # Like the viewer, a tab settles unless its own next action comes quickly.
+            nxt = next((e["t"] for e in self.events[i + 1:] if e.get("tab") == event.get("tab")), None)
+            settles = nxt is None or nxt - event["t"] >= SETTLE_SECONDS
+
+            t0 = time.perf_counter()
+            self._apply(event, settles)
+            self.latencies.setdefault(event["action"], []).append(time.perf_counter() - t0)
+
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        for tab in self.tabs.values():
+            self.pool.release(tab["miner"])
+        self.tabs.clear()
+        return self.report(py_peak)
+
+    def report(self, py_peak=0):
+        """Summarize latencies (ms) per action plus peak memory."""
+        actions = {}
+        for action, values in self.latencies.items():
+            values = sorted(values)
+            actions[action] = dict(count=len(values),
+                                   p50_ms=percentile(values, 0.50) * 1000,
+                                   p90_ms=percentile(values, 0.90) * 1000,
+                                   p95_ms=percentile(values, 0.95) * 1000,
+                                   p99_ms=percentile(values, 0.99) * 1000,
+                                   max_ms=values[-1] * 1000)
+        return dict(actions=actions,
+                    python_peak_mb=py_peak / (1024 * 1024),
+                    peak_rss_mb=peak_rss_mb())
+
+def median_result(results):
+    """Combine several replay results, taking the median of every figure."""
+    def median(values):
+        values = sorted(v for v in values if v is not None)
+        return percentile(values, 0.50) if values else None
+
+    actions = {}
+    for action, stats in results[0]["actions"].items():
+        runs = [r["actions"][action] for r in results if action in r["actions"]]
+        actions[action] = {k: median(s[k] for s in runs) for k in stats}
+    return dict(actions=actions,
+                python_peak_mb=median(r["python_peak_mb"] for r in results),
+                peak_rss_mb=median(r["peak_rss_mb"] for r in results),
+                runs=len(results))
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE, min_ms=DEFAULT_MIN_MS,
+            min_count=DEFAULT_MIN_COUNT):
+    """Return a list of actions whose p95 is more than tolerance slower than baseline.
+
+    A slowdown also has to be at least min_ms, and actions with fewer than
+    min_count samples on either side are skipped.
+    """
+    regressions = []
+    for action, stats in result["actions"].items():
+        base = baseline["actions"].get(action)
+        if not base or min(stats["count"], base["count"]) < min_count:
+            continue
+        slower = stats["p95_ms"] - base["p95_ms"]
+        if slower >= min_ms and stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{action}: p95 {base['p95_ms']:.1f} ms -> {stats['p95_ms']:.1f} ms")
+    return regressions
+
+def format_result(result):
+    """Render a replay result as a text table."""
+    cols = ("p50", "p90", "p95", "p99", "max")
+    lines = [f"{'action':<8}{'count':>7}" + "".join(f"{c + ' ms':>10}" for c in cols)]
+    for action, s in sorted(result["actions"].items()):
+        lines.append(f"{action:<8}{s['count']:>7}" + "".join(f"{s[c + '_ms']:>10.1f}" for c in cols))
+    if result.get("runs", 1) > 1:
+        lines.append(f"median of {result['runs']} runs")
+    lines.append(f"python heap peak: {result['python_peak_mb']:.1f} MB")
+    if result["peak_rss_mb"] is not None:
+        lines.append(f"process peak RSS: {result['peak_rss_mb']:.1f} MB")
+    return "\n".join(lines)
+
+def main(argv=None):
+    """Replay a recorded trace from the command line."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay a recorded viewer trace")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("replay")
+    p.add_argument("trace")
+    p.add_argument("--realtime", action="store_true", help="honour the recorded timing")
+    p.add_argument("--no-draft", action="store_true", help="always render in final quality")
+    p.add_argument("--map", action="append", default=[], metavar="OLD=NEW",
+                   help="rewrite a path prefix recorded in the trace")
+    p.add_argument("--runs", type=int, default=1, help="replay N times and report medians")
+    p.add_argument("--save", help="write the result as JSON")
+    p.add_argument("--baseline", help="compare against a saved result")
+    p.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    p.add_argument("--min-ms", type=float, default=DEFAULT_MIN_MS,
+                   help="ignore p95 slowdowns smaller than this")
+    p.add_argument("--min-count", type=int, default=DEFAULT_MIN_COUNT,
+                   help="skip actions with fewer samples than this")
+    args = parser.parse_args(argv)
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    path_map = dict(m.split("=", 1) for m in args.map)
+    events = load_trace(args.trace)
+    renderer = RenderProcess()
+    renderer.start()
+    try:
+        # A fresh replayer per run, so every run starts with cold page caches.
+        results = [TraceReplayer(events, path_map, args.realtime, draft=not args.no_draft,
+                                 renderer=renderer).run()
+                   for _ in range(args.runs)]
+    finally:
+        renderer.shutdown()
+    result = median_result(results) if len(results) > 1 else results[0]
+    print(format_result(result))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.min_ms,
+                                  args.min_count)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Persistent full-text index of PDFs across library folders (SQLite FTS5).
+
+Files are re-extracted only when their size/mtime changed and their content
+hash differs from the indexed version, so re-indexing an unchanged library
+costs one stat() per file.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import fitz
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".pdfviewer", "library.db")
+HASH_CHUNK = 1024 * 1024
+SEARCH_LIMIT = 200
+UPDATE_WAIT_POLL = 0.2  # seconds between cancel checks while another update runs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha1 TEXT,
+    pages INTEGER,
+    error TEXT,
+    indexed_at REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    path UNINDEXED, page UNINDEXED, text, tokenize = 'porter unicode61'
+);
+"""
+
+def file_hash(path):
+    """SHA-1 of a file's content."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def extract_text(path):
+    """Process-pool job: return (path, [page texts], error)."""
+    try:
+        with fitz.open(path) as doc:
+            if doc.needs_pass:
+                return path, [], "password protected"
+            return path, [page.get_text() for page in doc], None
+    except Exception as e:
+        return path, [], str(e)
+
+class LibraryIndex:
+    """Incremental full-text index of the PDFs in a set of folders."""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = db_path
+        self._updating = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        # One connection per call keeps the index usable from any worker thread.
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    # Folders
+    def folders(self):
+        """Return the configured library folders."""
+        with self._connect() as db:
+            return [row[0] for row in db.execute("SELECT path FROM folders ORDER BY path")]
+
+    def add_folder(self, folder):
+        """Add a folder (searched recursively) to the library."""
+        with self._connect() as db:
+            db.execute("INSERT OR IGNORE INTO folders VALUES (?)", (os.path.abspath(folder),))
+
+    def remove_folder(self, folder):
+        """Remove a folder and everything indexed under it."""
+        folder = os.path.abspath(folder)
+        prefix = os.path.join(folder, "")
+        with self._connect() as db:
+            db.execute("DELETE FROM folders WHERE path = ?", (folder,))
+            db.execute("DELETE FROM pages WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+            db.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+
+    # Indexing
+    def _scan(self):
+        """Return {path: (size, mtime_ns)} for every PDF under the library folders."""
+        found = {}
+        for folder in self.folders():
+            for dirpath, _, names in os.walk(folder):
+                for name in names:
+                    if name.lower().endswith(".pdf"):
+                        path = os.path.join(dirpath, name)
+                        try:
+                            st = os.stat(path)
+                        except OSError:
+                            continue
+                        found[path] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def update(self, workers=None, progress=None, token=None):
+        """Bring the index up to date; returns counts of added/updated/removed/unchanged files.
+
+        progress(done, total) is called as changed files finish extracting. If a
+        CancelToken is given, indexing stops between files once it is cancelled.
+        If another update of this index is running, this one waits for it to
+        finish and then scans again; returns None if cancelled while waiting.
+        """
+        while not self._updating.acquire(timeout=UPDATE_WAIT_POLL):
+            if token and token.cancelled:
+                return None
+        try:
+            return self._update(workers, progress, token)
+        finally:
+            self._updating.release()
+
+    def _update(self, workers, progress, token):
+        found = self._scan()
+        with self._connect() as db:
+            known = {row[0]: row[1:] for row in
+                     db.execute("SELECT path, size, mtime_ns, sha1 FROM files")}
+
+        removed = [p for p in known if p not in found]
+        touched = [p for p, stat in found.items() if known.get(p, (None, None))[:2] != stat]
+        counts = dict(added=0, updated=0, removed=len(removed),
+                      unchanged=len(found) - len(touched))
+
+        # A newer mtime alone (copy, touch, re-save) does not force re-extraction.
+        hashes, changed = {}, []
+        for path in touched:
+            if token and token.cancelled:
+                break
+            try:
+                hashes[path] = file_hash(path)
+            except OSError:
+                continue
+            if path in known and known[path][2] == hashes[path]:
+                counts["unchanged"] += 1
+            else:
+                changed.append(path)
+
+        with self._connect() as db:
+            for path in removed:
+                db.execute("DELETE FROM pages WHERE path = ?", (path,))
+                db.execute("DELETE FROM files WHERE path = ?", (path,))
+            for path in touched:
+                if path in hashes and path not in changed:
+                    db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                               (*found[path], path))
+
+        if changed and not (token and token.cancelled):
+            # The viewer's periodic scan runs on a worker thread, so spawn rather
+            # than fork a copy of the multi-threaded GUI process.
+            spawn = multiprocessing.get_context("spawn")
+            with self._connect() as db, \
+                    ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=spawn) as pool:
+                results = pool.map(extract_text, changed, chunksize=8)
+                for done, (path, texts, error) in enumerate(results, 1):
+                    if token and token.cancelled:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+                    with db:  # one transaction per file, so progress survives interruption
+                        db.execute("DELETE FROM pages WHERE path = ?", (path,))
+                        db.executemany("INSERT INTO pages (path, page, text) VALUES (?, ?, ?)",
+                                       [(path, pno, text) for pno, text in enumerate(texts)])
+                        db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   (path, *found[path], hashes[path], len(texts), error, time.time()))
+                    counts["updated" if path in known else "added"] += 1
+                    if progress:
+                        progress(done, len(changed))
+        return counts
+
+    # Searching
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Return [(path, page, snippet)] best matches first; page is 0-based."""
+        sql = ("SELECT path, page, snippet(pages, 2, '[', ']', '…', 12) FROM pages "
+               "WHERE pages MATCH ? ORDER BY rank LIMIT ?")
+        with self._connect() as db:
+            try:
+                return db.execute(sql, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                # Not valid FTS5 syntax: search for the literal phrase instead.
+                phrase = '"' + query.replace('"', '""') + '"'
+                return db.execute(sql, (phrase, limit)).fetchall()
+
+    def stats(self):
+        """Return file and page counts."""
+        with self._connect() as db:
+            files = db.execute("SELECT count(*) FROM files").fetchone()[0]
+            pages = db.execute("SELECT coalesce(sum(pages), 0) FROM files").fetchone()[0]
+        return dict(files=files, pages=pages)
+
+def main(argv=None):
+    """Manage and query the library index from the command line."""
+    import argparse
+    parser = argparse.ArgumentParser(description="PDF library full-text index")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("add", help="add a folder").add_argument("folder")
+    sub.add_parser("remove", help="remove a folder").add_argument("folder")
+    sub.add_parser("folders", help="list folders")
+    p = sub.add_parser("index", help="update the index")
+    p.add_argument("--workers", type=int, default=None)
+    p = sub.add_parser("watch", help="update the index periodically")
+    p.add_argument("--interval", type=int, default=300, help="seconds between scans")
+    p = sub.add_parser("search", help="full-text search")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    index = LibraryIndex(args.db)
+    if args.command == "add":
+        index.add_folder(args.folder)
+    elif args.command == "remove":
+        index.remove_folder(args.folder)
+    elif args.command == "folders":
+        print("\n".join(index.folders()))
+    elif args.command == "index":
+        start = time.perf_counter()
+        counts = index.update(args.workers)
+        print(f"{counts} in {time.perf_counter() - start:.1f} s")
+    elif args.command == "watch":
+        while True:
+            print(index.update())
+            time.sleep(args.interval)
+    else:
+        for path, page, snippet in index.search(args.query, args.limit):
+            print(f"{path} p.{page + 1}: {' '.join(snippet.split())}")
+
+if __name__ == "__main__":
+    main()
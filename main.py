@@ -4,13 +4,39 @@ PDF Viewer Application
 Main entry point for the PDF viewer application.
 """
 
+import argparse
+import multiprocessing
 import tkinter as tk
 from pdf_viewer import Viewer
 
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="PDF Viewer")
+    parser.add_argument("--serve", action="store_true",
+                        help="run the shared render server headless instead of the GUI")
+    parser.add_argument("--port", type=int, default=None,
+                        help="port for --serve")
+    parser.add_argument("--server", metavar="URL",
+                        help="render pages through a running render server")
+    return parser.parse_args(argv)
+
 def main():
     """Initialize and run the PDF viewer application."""
+    multiprocessing.freeze_support()  # worker processes in the frozen executable
+    args = parse_args()
+
+    if args.serve:
+        import render_server
+        render_server.main([] if args.port is None else ["--port", str(args.port)])
+        return
+
+    render_client = None
+    if args.server:
+        from render_server import RenderClient
+        render_client = RenderClient(args.server)
+
     root = tk.Tk()
-    app = Viewer(root)
+    app = Viewer(root, render_client=render_client)
     root.mainloop()
 
 if __name__ == "__main__":
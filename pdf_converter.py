@@ -2,75 +2,64 @@
 PDF conversion functionality for Word documents and other formats.
 """
 
-import threading
 from tkinter import filedialog as fd, messagebox
 from pdf2docx import Converter
 from docx2pdf import convert
 
+from task_executor import PRIORITY_BACKGROUND
+
+def _pdf_to_docx(src, dst):
+    """Convert a PDF file to DOCX."""
+    Converter(src).convert(dst)
+
 class PDFConverter:
-    """Handles PDF conversion operations."""
+    """Handles PDF conversion operations.
+    
+    File dialogs run on the Tk thread; the conversion itself runs on the parent's
+    executor and reports back through messageboxes on the Tk thread.
+    """
     
     def __init__(self, parent):
         self.parent = parent
     
+    def _run(self, fn, src, dst, done_msg):
+        """Run a conversion in the background and report the outcome."""
+        self.parent.executor.submit(
+            fn, src, dst,
+            priority=PRIORITY_BACKGROUND,
+            on_done=lambda _: messagebox.showinfo("Done", done_msg),
+            on_error=lambda e: messagebox.showerror("Error", str(e)))
+    
     def pdf_to_word(self, source_path=None):
         """Convert PDF to Word document."""
-        def run():
-            src = source_path or fd.askopenfilename(filetypes=[("PDF", "*.pdf")])
-            if not src:
-                return
-            
-            dst = fd.asksaveasfilename(
-                defaultextension=".docx",
-                filetypes=[("Word", "*.docx")]
-            )
-            if not dst:
-                return
-            
-            try:
-                Converter(src).convert(dst)
-                messagebox.showinfo("Done", "Converted to Word.")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+        src = source_path or fd.askopenfilename(filetypes=[("PDF", "*.pdf")])
+        if not src:
+            return
         
-        threading.Thread(target=run, daemon=True).start()
+        dst = fd.asksaveasfilename(
+            defaultextension=".docx",
+            filetypes=[("Word", "*.docx")]
+        )
+        if not dst:
+            return
+        
+        self._run(_pdf_to_docx, src, dst, "Converted to Word.")
     
     def word_to_pdf(self):
         """Convert Word document to PDF."""
-        def run():
-            src = fd.askopenfilename(filetypes=[("Word", "*.docx")])
-            if not src:
-                return
-            
-            dst = fd.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF", "*.pdf")]
-            )
-            if not dst:
-                return
-            
-            try:
-                convert(src, dst)
-                messagebox.showinfo("Done", "DOCX converted to PDF.")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+        src = fd.askopenfilename(filetypes=[("Word", "*.docx")])
+        if not src:
+            return
+        
+        dst = fd.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF", "*.pdf")]
+        )
+        if not dst:
+            return
         
-        threading.Thread(target=run, daemon=True).start()
+        self._run(convert, src, dst, "DOCX converted to PDF.")
     
     def convert_current_to_word(self, pdf_path):
         """Convert currently opened PDF to Word."""
-        def run():
-            dst = fd.asksaveasfilename(
-                defaultextension=".docx",
-                filetypes=[("Word", "*.docx")]
-            )
-            if not dst:
-                return
-            
-            try:
-                Converter(pdf_path).convert(dst)
-                messagebox.showinfo("Done", "Converted to Word.")
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
-        
-        threading.Thread(target=run, daemon=True).start()
+        self.pdf_to_word(pdf_path)
@@ -2,19 +2,120 @@
 PDF processing and rendering functionality using PyMuPDF and pikepdf.
 """
 
+import multiprocessing
 import os
 import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import fitz
 import pikepdf
 from tkinter import PhotoImage
 
+from page_colors import NORMAL, transform_pnm
+from render_cache import RenderCache
+
 DEFAULT_ZOOM = 2.5
+MINER_CACHE_BYTES = 64 * 1024 * 1024
+DISPLAY_LIST_PAGES = 8
+RENDER_PROCESSES = min(2, os.cpu_count() or 1)
+CHILD_DOCS = 8  # open documents kept per render process
+
+# Rendering quality profiles. "aa" is the MuPDF anti-aliasing level (0-8), "gray"
+# renders in DeviceGray, "annots" draws annotations and "max_px" caps the longer
+# side of the raster in pixels (None = no cap). With "upscale", render() stretches
+# a capped raster back to the requested size, so a draft has the same on-screen
+# size as the final render that replaces it.
+PROFILES = {
+    "final": dict(aa=8, gray=False, annots=True, max_px=None, upscale=False),
+    "draft": dict(aa=2, gray=False, annots=False, max_px=1600, upscale=True),
+    "draft_gray": dict(aa=2, gray=True, annots=False, max_px=1600, upscale=True),
+}
+DEFAULT_PROFILE = "final"
+DRAFT_PROFILE = "draft"
+
+# MuPDF keeps global state, so all document access is serialized through this lock
+# when pages are rendered from more than one thread (e.g. by the render server).
+FITZ_LOCK = threading.RLock()
+
+def recolor(ppm, colors, fmt="ppm"):
+    """Apply a page colour mode to a PPM/PGM render and encode the result as fmt."""
+    data = transform_pnm(ppm, colors)
+    if fmt != "ppm":
+        with FITZ_LOCK:
+            data = fitz.Pixmap(data).tobytes(fmt)
+    return data
+
+_child_miners = OrderedDict()  # in render processes: (path, pwd, size, mtime_ns) -> PDFMiner
+
+def _render_in_child(path, pwd, pno, factor, profile, clip, fmt):
+    """Render-process job: rasterize one page and return it encoded as fmt."""
+    st = os.stat(path)
+    key = (path, pwd, st.st_size, st.st_mtime_ns)
+    miner = _child_miners.get(key)
+    if miner is None:
+        miner = _child_miners[key] = PDFMiner(path, pwd, cache_bytes=0)
+        while len(_child_miners) > CHILD_DOCS:
+            _child_miners.popitem(last=False)[1].close()
+    else:
+        _child_miners.move_to_end(key)
+    return miner.raster(pno, factor, profile, clip).tobytes(fmt)
+
+class RenderProcess:
+    """Rasterizes pages in worker processes.
+
+    PyMuPDF holds the GIL while it rasterizes, so a render on a worker thread
+    still freezes the Tk loop for the whole render. In a separate process only
+    receiving the finished image touches this one.
+    """
+
+    def __init__(self, workers=RENDER_PROCESSES):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawn, not fork: forking while other threads hold MuPDF or Tk
+                # state can deadlock the child.
+                self._pool = ProcessPoolExecutor(self.workers,
+                                                 multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def start(self):
+        """Start the worker processes ahead of the first render."""
+        self._get_pool().submit(os.getpid)
+
+    def render(self, path, pwd, pno, factor=1.0, profile=DEFAULT_PROFILE, clip=None, fmt="ppm"):
+        """Render a page in a worker process and return the encoded image bytes."""
+        pool = self._get_pool()
+        try:
+            return pool.submit(_render_in_child, path, pwd, pno, factor, profile,
+                               tuple(clip) if clip else None, fmt).result()
+        except BrokenProcessPool as e:
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None  # start fresh processes on the next render
+            raise RuntimeError("render process stopped unexpectedly") from e
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
 
 class PDFMiner:
     """Handles PDF file opening, rendering, and basic operations."""
     
-    def __init__(self, path, pwd=None):
+    def __init__(self, path, pwd=None, cache_bytes=MINER_CACHE_BYTES, renderer=None):
         self.path = path
+        self.pwd = pwd
+        self.renderer = renderer  # optional RenderProcess used for cache misses
+        self.cache = RenderCache(cache_bytes)
+        self._display_lists = OrderedDict()
         try:
             self.doc = fitz.open(path)
             # Better password handling for encrypted PDFs
@@ -63,18 +164,100 @@ class PDFMiner:
         """Return the total number of pages in the PDF."""
         return self.doc.page_count
 
-    def image(self, pno, factor=1.0):
+    def _display_list(self, pno, annots):
+        """Return the page's parsed content as a display list, kept in a small LRU."""
+        key = (pno, annots)
+        dl = self._display_lists.get(key)
+        if dl is None:
+            dl = self._display_lists[key] = self.doc[pno].get_displaylist(annots=annots)
+            while len(self._display_lists) > DISPLAY_LIST_PAGES:
+                self._display_lists.popitem(last=False)
+        else:
+            self._display_lists.move_to_end(key)
+        return dl
+
+    def _matrix(self, rect, factor, opts):
+        """Build the render matrix, honouring the profile's resolution cap."""
+        zoom = self.base_zoom * factor
+        if opts["max_px"]:
+            zoom = min(zoom, opts["max_px"] / max(rect.width, rect.height))
+        return fitz.Matrix(zoom, zoom)
+
+    def pixmap(self, pno, factor=1.0, profile=DEFAULT_PROFILE, clip=None):
+        """Render the specified page (optionally only clip, in page units) to an alpha-free fitz.Pixmap."""
+        opts = PROFILES[profile]
+        with FITZ_LOCK:
+            # Re-zooming replays the cached display list instead of re-interpreting
+            # the page's content stream.
+            dl = self._display_list(pno, opts["annots"])
+            # The anti-aliasing level is global MuPDF state, so set it on every render.
+            fitz.TOOLS.set_aa_level(opts["aa"])
+            mat = self._matrix(dl.rect, factor, opts)
+            pix = dl.get_pixmap(matrix=mat,
+                                colorspace=fitz.csGRAY if opts["gray"] else fitz.csRGB,
+                                alpha=False,
+                                clip=fitz.Rect(clip) if clip else None)
+        return pix
+
+    def raster(self, pno, factor=1.0, profile=DEFAULT_PROFILE, clip=None):
+        """Return the pixmap for render(): pixmap(), upscaled if the profile asks for it."""
+        pix = self.pixmap(pno, factor, profile, clip)
+        opts = PROFILES[profile]
+        if opts["upscale"] and opts["max_px"]:
+            with FITZ_LOCK:
+                rect = fitz.Rect(clip) if clip else self.doc[pno].rect
+                zoom = self.base_zoom * factor
+                width, height = round(rect.width * zoom), round(rect.height * zoom)
+                if width > pix.width or height > pix.height:
+                    pix = fitz.Pixmap(pix, width, height, None)
+        return pix
+
+    def render(self, pno, factor=1.0, fmt="ppm", profile=DEFAULT_PROFILE, clip=None, colors=NORMAL):
+        """Render the specified page and return it encoded as image bytes."""
+        key = (pno, round(factor, 4), profile, fmt, tuple(clip) if clip else None)
+        if colors != NORMAL:
+            # Tinted renders are derived from the cached plain PPM, so switching
+            # colour modes re-tints instead of rasterizing the page again.
+            data = self.cache.get(key + (colors,))
+            if data is None:
+                data = recolor(self.render(pno, factor, "ppm", profile, clip), colors, fmt)
+                self.cache.put(key + (colors,), data)
+            return data
+        data = self.cache.get(key)
+        if data is None:
+            if self.renderer is not None:
+                data = self.renderer.render(self.path, self.pwd, pno, factor, profile, clip, fmt)
+            else:
+                pix = self.raster(pno, factor, profile, clip)
+                with FITZ_LOCK:
+                    data = pix.tobytes(fmt)
+            self.cache.put(key, data)
+        return data
+
+    def image(self, pno, factor=1.0, profile=DEFAULT_PROFILE, colors=NORMAL):
         """Generate a PhotoImage for the specified page number with zoom factor."""
-        mat = fitz.Matrix(self.base_zoom * factor, self.base_zoom * factor)
-        pix = self.doc[pno].get_pixmap(matrix=mat)
-        if pix.alpha:
-            pix = fitz.Pixmap(pix, 0)
-        return PhotoImage(data=pix.tobytes("ppm"))
+        return PhotoImage(data=self.render(pno, factor, profile=profile, colors=colors))
+
+    def text(self, pno):
+        """Return the plain text of the specified page."""
+        with FITZ_LOCK:
+            return self.doc[pno].get_text()
+
+    @property
+    def metadata(self):
+        """Return the document metadata together with the page count."""
+        with FITZ_LOCK:
+            meta = dict(self.doc.metadata or {})
+        meta["pages"] = self.pages
+        meta["base_zoom"] = self.base_zoom
+        return meta
 
     def close(self):
         """Close the PDF document."""
-        if hasattr(self, 'doc') and self.doc:
-            self.doc.close()
+        if getattr(self, 'doc', None) is not None and not self.doc.is_closed:
+            with FITZ_LOCK:
+                self._display_lists.clear()
+                self.doc.close()
 
     def __del__(self):
         """Cleanup when object is destroyed."""
@@ -0,0 +1,266 @@
+"""
+PDF optimization: object streams, Flate recompression, de-duplication and linearization.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tkinter import filedialog as fd, messagebox
+
+import fitz
+import pikepdf
+
+from task_executor import CancelToken, PRIORITY_BACKGROUND
+
+OPEN_TIME_RUNS = 3
+FONT_FILE_KEYS = ("/FontFile", "/FontFile2", "/FontFile3")
+
+def measure_open_time(path, runs=OPEN_TIME_RUNS, pwd=None):
+    """Return the best time in seconds to open a PDF and render its first page."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        doc = fitz.open(path)
+        if doc.needs_pass and not doc.authenticate(pwd or ""):
+            doc.close()
+            raise pikepdf.PasswordError("password required")
+        if doc.page_count:
+            doc[0].get_pixmap()
+        doc.close()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _value_key(value):
+    """Stable representation of a stream dictionary value for hashing."""
+    if getattr(value, "is_indirect", False):
+        return f"ref{value.objgen}"
+    return repr(value)
+
+def _stream_digest(stream):
+    """Hash a stream's raw (still encoded) data together with its dictionary."""
+    h = hashlib.sha1(stream.read_raw_bytes())
+    for key in sorted(k for k in stream.keys() if k != "/Length"):
+        h.update(key.encode())
+        h.update(_value_key(stream[key]).encode())
+    return h.digest()
+
+def _canonical(stream, seen):
+    """Return the first stream seen with identical content, registering new ones."""
+    return seen.setdefault(_stream_digest(stream), stream)
+
+def _font_descriptors(font):
+    """Yield the font descriptors of a simple or composite font dictionary."""
+    if "/FontDescriptor" in font:
+        yield font.FontDescriptor
+    for descendant in font.get("/DescendantFonts", []):
+        if "/FontDescriptor" in descendant:
+            yield descendant.FontDescriptor
+
+def _dedupe_resources(resources, images, fonts, visited, counts):
+    """Point duplicate image XObjects and embedded font programs at one shared copy."""
+    if resources is None:
+        return
+    if resources.is_indirect:
+        if resources.objgen in visited:
+            return
+        visited.add(resources.objgen)
+
+    xobjects = resources.get("/XObject", {})
+    for name in list(xobjects.keys()):
+        xobj = xobjects[name]
+        if not isinstance(xobj, pikepdf.Stream):
+            continue
+        if xobj.get("/Subtype") == "/Image":
+            canonical = _canonical(xobj, images)
+            if canonical.objgen != xobj.objgen:
+                xobjects[name] = canonical
+                counts["images"] += 1
+        elif xobj.get("/Subtype") == "/Form" and xobj.objgen not in visited:
+            visited.add(xobj.objgen)
+            _dedupe_resources(xobj.get("/Resources"), images, fonts, visited, counts)
+
+    font_dict = resources.get("/Font", {})
+    for name in list(font_dict.keys()):
+        for descriptor in _font_descriptors(font_dict[name]):
+            for key in FONT_FILE_KEYS:
+                if key not in descriptor:
+                    continue
+                canonical = _canonical(descriptor[key], fonts)
+                if canonical.objgen != descriptor[key].objgen:
+                    descriptor[key] = canonical
+                    counts["fonts"] += 1
+
+def deduplicate(pdf):
+    """De-duplicate identical images and embedded fonts; return the counts replaced."""
+    counts = dict(images=0, fonts=0)
+    images, fonts, visited = {}, {}, set()
+    for page in pdf.pages:
+        _dedupe_resources(page.obj.get("/Resources"), images, fonts, visited, counts)
+    return counts
+
+def optimize_pdf(src, dst, linearize=False, pwd=None, measure=True):
+    """Write an optimized copy of src to dst and return a report dict."""
+    report = dict(src=src, dst=dst, size_before=os.path.getsize(src))
+    if measure:
+        report["open_before"] = measure_open_time(src, pwd=pwd)
+
+    with pikepdf.open(src, password=pwd or "") as pdf:
+        report.update(deduplicate(pdf))
+        pdf.remove_unreferenced_resources()
+        # qpdf only writes objects reachable from the trailer, so anything left
+        # unreferenced after de-duplication is dropped here.
+        if pdf.is_encrypted:
+            # Keep the source's encryption and permissions (owner-password-only
+            # files open without a password); qpdf cannot re-encode streams while
+            # encrypting, so these get de-duplication and object streams only.
+            recompress = dict(encryption=True)
+        else:
+            recompress = dict(recompress_flate=True,
+                              stream_decode_level=pikepdf.StreamDecodeLevel.generalized)
+        pdf.save(dst,
+                 compress_streams=True,
+                 object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                 linearize=linearize,
+                 **recompress)
+
+    report["size_after"] = os.path.getsize(dst)
+    if measure:
+        report["open_after"] = measure_open_time(dst, pwd=pwd)
+    return report
+
+def optimize_in_process(src, dst, linearize=False, pwd=None, measure=True):
+    """Run optimize_pdf in a separate process and return its report.
+
+    Measuring renders first pages with PyMuPDF, which holds the GIL, so running
+    it on a viewer thread would freeze the Tk loop for seconds on heavy pages.
+    """
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(optimize_pdf, src, dst, linearize, pwd, measure).result()
+
+def _optimize_job(src, dst, linearize, measure):
+    """Process-pool entry point that reports failures instead of raising."""
+    try:
+        return optimize_pdf(src, dst, linearize, measure=measure)
+    except Exception as e:
+        return dict(src=src, dst=dst, error=str(e))
+
+def optimize_folder(src_dir, dst_dir, linearize=False, measure=True, workers=None, token=None):
+    """Optimize every PDF in src_dir into dst_dir using all cores; yields reports as they finish.
+
+    If a CancelToken is given, files not yet started are dropped once it is cancelled.
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    names = sorted(n for n in os.listdir(src_dir) if n.lower().endswith(".pdf"))
+    # Spawn, not fork: this pool is started from viewer executor threads.
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_optimize_job, os.path.join(src_dir, n),
+                               os.path.join(dst_dir, n), linearize, measure)
+                   for n in names]
+        for future in as_completed(futures):
+            if token and token.cancelled:
+                for pending in futures:
+                    pending.cancel()
+                token.raise_if_cancelled()
+            yield future.result()
+
+def format_report(report):
+    """Return a one-line human-readable summary of an optimize report."""
+    name = os.path.basename(report["src"])
+    if "error" in report:
+        return f"{name}: failed ({report['error']})"
+    before, after = report["size_before"], report["size_after"]
+    saved = 100 * (before - after) / before if before else 0
+    line = f"{name}: {before / 1024:,.0f} KB -> {after / 1024:,.0f} KB ({saved:.0f}% smaller)"
+    if "open_before" in report:
+        line += f", open {report['open_before'] * 1000:.0f} ms -> {report['open_after'] * 1000:.0f} ms"
+    if report.get("images") or report.get("fonts"):
+        line += f", {report['images']} images / {report['fonts']} fonts de-duplicated"
+    return line
+
+class PDFOptimizer:
+    """Handles the Optimize & Save actions."""
+
+    def __init__(self, parent):
+        self.parent = parent
+
+    def optimize_pdf(self, source_path=None):
+        """Optimize a single PDF and save it under a new name."""
+        src = source_path or fd.askopenfilename(title="Select PDF to optimize",
+                                                filetypes=[("PDF", "*.pdf")])
+        if not src:
+            return
+
+        dst = fd.asksaveasfilename(title="Save optimized PDF as...",
+                                   defaultextension=".pdf",
+                                   filetypes=[("PDF", "*.pdf")])
+        if not dst:
+            return
+        if os.path.abspath(dst) == os.path.abspath(src):
+            messagebox.showerror("Error", "Choose a different file name for the optimized PDF.")
+            return
+
+        linearize = messagebox.askyesno("Optimize", "Linearize for fast web view?")
+
+        def failed(exc):
+            if isinstance(exc, pikepdf.PasswordError):
+                messagebox.showerror("Error", "Unlock the PDF before optimizing it.")
+            else:
+                messagebox.showerror("Error", str(exc))
+
+        self.parent.executor.submit(optimize_in_process, src, dst, linearize,
+                                    priority=PRIORITY_BACKGROUND,
+                                    on_done=lambda report: messagebox.showinfo("Done", format_report(report)),
+                                    on_error=failed)
+
+    def optimize_folder(self):
+        """Optimize every PDF in a folder in parallel."""
+        src_dir = fd.askdirectory(title="Select folder of PDFs to optimize")
+        if not src_dir:
+            return
+        dst_dir = fd.askdirectory(title="Select output folder")
+        if not dst_dir:
+            return
+        if os.path.abspath(dst_dir) == os.path.abspath(src_dir):
+            messagebox.showerror("Error", "Choose a different output folder.")
+            return
+
+        linearize = messagebox.askyesno("Optimize", "Linearize for fast web view?")
+
+        def done(reports):
+            failed = sum("error" in r for r in reports)
+            before = sum(r.get("size_before", 0) for r in reports if "error" not in r)
+            after = sum(r.get("size_after", 0) for r in reports if "error" not in r)
+            summary = (f"Optimized {len(reports) - failed} of {len(reports)} PDFs.\n"
+                       f"Total size: {before / 1048576:,.1f} MB -> {after / 1048576:,.1f} MB")
+            details = "\n".join(format_report(r) for r in reports if "error" in r)
+            messagebox.showinfo("Done", summary + ("\n\n" + details if details else ""))
+
+        token = CancelToken()
+        self.parent.executor.submit(lambda: list(optimize_folder(src_dir, dst_dir, linearize, token=token)),
+                                    priority=PRIORITY_BACKGROUND, on_done=done, token=token)
+
+def main(argv=None):
+    """Optimize a PDF or a folder of PDFs from the command line."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Optimize PDFs for faster opening")
+    parser.add_argument("src", help="PDF file or folder")
+    parser.add_argument("dst", help="output PDF file or folder")
+    parser.add_argument("--linearize", action="store_true")
+    parser.add_argument("--no-measure", action="store_true", help="skip open-time measurement")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.src):
+        reports = optimize_folder(args.src, args.dst, args.linearize,
+                                  not args.no_measure, args.workers)
+    else:
+        reports = [optimize_pdf(args.src, args.dst, args.linearize, measure=not args.no_measure)]
+    for report in reports:
+        print(format_report(report))
+
+if __name__ == "__main__":
+    main()
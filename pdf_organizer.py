@@ -0,0 +1,218 @@
+"""
+Page extraction, splitting and merging for large PDFs using pikepdf.
+
+Sources are opened memory-mapped and pages are copied as foreign objects, so
+stream data is only read while the output is being written and resources shared
+between pages are copied once per output file.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tkinter import filedialog as fd, messagebox, simpledialog
+
+import pikepdf
+
+from task_executor import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+DEFAULT_SPLIT_PAGES = 50
+
+def parse_ranges(spec, page_count):
+    """Turn a spec like "1-3, 7, 10-" into a list of 0-based page indices."""
+    pages = []
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            first = int(start) if start else 1
+            last = int(end) if end else page_count
+        else:
+            first = last = int(part)
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"page range {part!r} is outside 1-{page_count}")
+        pages.extend(range(first - 1, last))
+    if not pages:
+        raise ValueError("no pages selected")
+    return pages
+
+def _open(path, pwd=None):
+    return pikepdf.open(path, password=pwd or "", access_mode=pikepdf.AccessMode.mmap)
+
+def page_count(path, pwd=None):
+    """Return the number of pages without loading page content."""
+    with _open(path, pwd) as pdf:
+        return len(pdf.pages)
+
+def extract_pages(src, dst, pages, pwd=None):
+    """Write the given 0-based pages of src, in order, to dst."""
+    with _open(src, pwd) as pdf, pikepdf.new() as out:
+        for pno in pages:
+            out.pages.append(pdf.pages[pno])
+        out.save(dst, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    return dict(src=src, dst=dst, pages=len(pages))
+
+def _extract_job(src, dst, pages, pwd):
+    """Process-pool entry point that reports failures instead of raising."""
+    try:
+        return extract_pages(src, dst, pages, pwd)
+    except Exception as e:
+        return dict(src=src, dst=dst, error=str(e))
+
+def split_pdf(src, dst_dir, every=DEFAULT_SPLIT_PAGES, pwd=None, workers=None):
+    """Split src into files of `every` pages in parallel; yields a report per file as it finishes."""
+    os.makedirs(dst_dir, exist_ok=True)
+    total = page_count(src, pwd)
+    stem = os.path.splitext(os.path.basename(src))[0]
+    width = len(str(total))
+    chunks = [(start, min(start + every, total)) for start in range(0, total, every)]
+
+    # Split runs from a viewer executor thread; a forked child could inherit a held lock.
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_extract_job, src,
+                               os.path.join(dst_dir, f"{stem}_p{start + 1:0{width}d}-{end:0{width}d}.pdf"),
+                               list(range(start, end)), pwd)
+                   for start, end in chunks]
+        for future in as_completed(futures):
+            yield future.result()
+
+def merge_pdfs(srcs, dst):
+    """Concatenate the pages of every file in srcs into dst."""
+    opened = []
+    pages = 0
+    try:
+        with pikepdf.new() as out:
+            for src in srcs:
+                pdf = _open(src)
+                opened.append(pdf)
+                out.pages.extend(pdf.pages)
+                pages += len(pdf.pages)
+            # Sources must stay open until save() has streamed their page data.
+            out.save(dst, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    finally:
+        for pdf in opened:
+            pdf.close()
+    return dict(src=srcs, dst=dst, pages=pages)
+
+class PDFOrganizer:
+    """Handles extract, split and merge actions."""
+
+    def __init__(self, parent):
+        self.parent = parent
+
+    def _run(self, fn, *args, on_done, error_hint=None):
+        """Run fn on the executor and report errors on the Tk thread."""
+        def failed(exc):
+            if error_hint and isinstance(exc, pikepdf.PasswordError):
+                messagebox.showerror("Error", error_hint)
+            else:
+                messagebox.showerror("Error", str(exc))
+
+        self.parent.executor.submit(fn, *args, priority=PRIORITY_BACKGROUND,
+                                    on_done=on_done, on_error=failed)
+
+    def extract_pages(self, source_path=None):
+        """Save a selection of pages as a new PDF."""
+        src = source_path or fd.askopenfilename(title="Select PDF", filetypes=[("PDF", "*.pdf")])
+        if not src:
+            return
+        self.parent.executor.submit(
+            page_count, src, priority=PRIORITY_INTERACTIVE,
+            on_done=lambda total: self._ask_and_extract(src, total),
+            on_error=lambda e: messagebox.showerror("Error", f"Could not read PDF: {str(e)}"))
+
+    def _ask_and_extract(self, src, total):
+        """Ask for the page selection and destination, then extract in the background."""
+        spec = simpledialog.askstring("Extract Pages", f"Pages to extract (1-{total}), e.g. 1-3, 7, 10-:")
+        if not spec:
+            return
+        try:
+            pages = parse_ranges(spec, total)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        dst = fd.asksaveasfilename(title="Save extracted pages as...",
+                                   defaultextension=".pdf",
+                                   filetypes=[("PDF", "*.pdf")])
+        if not dst:
+            return
+
+        self._run(extract_pages, src, dst, pages,
+                  on_done=lambda _: messagebox.showinfo(
+                      "Done", f"Extracted {len(pages)} page(s) to {os.path.basename(dst)}."))
+
+    def split_pdf(self, source_path=None):
+        """Split a PDF into files of a fixed number of pages."""
+        src = source_path or fd.askopenfilename(title="Select PDF to split", filetypes=[("PDF", "*.pdf")])
+        if not src:
+            return
+        every = simpledialog.askinteger("Split PDF", "Pages per file:",
+                                        initialvalue=DEFAULT_SPLIT_PAGES, minvalue=1)
+        if not every:
+            return
+        dst_dir = fd.askdirectory(title="Select output folder")
+        if not dst_dir:
+            return
+
+        def done(reports):
+            failed = [r for r in reports if "error" in r]
+            if failed:
+                messagebox.showerror("Error", "\n".join(f"{os.path.basename(r['dst'])}: {r['error']}"
+                                                        for r in failed))
+            else:
+                messagebox.showinfo("Done", f"Split into {len(reports)} file(s).")
+
+        self._run(lambda: list(split_pdf(src, dst_dir, every)), on_done=done)
+
+    def merge_pdfs(self):
+        """Merge several PDFs, in the order selected, into one file."""
+        srcs = fd.askopenfilenames(title="Select PDFs to merge", filetypes=[("PDF", "*.pdf")])
+        if not srcs:
+            return
+        dst = fd.asksaveasfilename(title="Save merged PDF as...",
+                                   defaultextension=".pdf",
+                                   filetypes=[("PDF", "*.pdf")])
+        if not dst:
+            return
+
+        self._run(merge_pdfs, list(srcs), dst,
+                  on_done=lambda _: messagebox.showinfo(
+                      "Done", f"Merged {len(srcs)} file(s) into {os.path.basename(dst)}."),
+                  error_hint="Unlock password-protected PDFs before merging.")
+
+def main(argv=None):
+    """Extract, split or merge PDFs from the command line."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Extract, split and merge PDF pages")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extract", help="copy a page selection into a new PDF")
+    p.add_argument("src")
+    p.add_argument("dst")
+    p.add_argument("--pages", required=True, help='e.g. "1-3,7,10-"')
+
+    p = sub.add_parser("split", help="split into files of N pages")
+    p.add_argument("src")
+    p.add_argument("dst_dir")
+    p.add_argument("--every", type=int, default=DEFAULT_SPLIT_PAGES)
+    p.add_argument("--workers", type=int, default=None)
+
+    p = sub.add_parser("merge", help="concatenate PDFs")
+    p.add_argument("dst")
+    p.add_argument("srcs", nargs="+")
+
+    args = parser.parse_args(argv)
+    if args.command == "extract":
+        report = extract_pages(args.src, args.dst, parse_ranges(args.pages, page_count(args.src)))
+        print(f"{report['dst']}: {report['pages']} page(s)")
+    elif args.command == "split":
+        for report in split_pdf(args.src, args.dst_dir, args.every, workers=args.workers):
+            print(f"{report['dst']}: {report.get('error') or 'ok'}")
+    else:
+        merge_pdfs(args.srcs, args.dst)
+        print(args.dst)
+
+if __name__ == "__main__":
+    main()
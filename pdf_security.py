@@ -37,29 +37,36 @@ def unlock_pdf_with_pikepdf(src, pwd):
     return tmp
 
 class PDFSecurity:
-    """Handles PDF security operations like locking, unlocking, and permissions."""
+    """Handles PDF security operations like locking, unlocking, and permissions.
+    
+    The pikepdf work runs on the parent's executor; results are reported through
+    the on_result(dst_path, pwd) callback on the Tk thread.
+    """
     
     def __init__(self, parent):
         self.parent = parent
     
-    def open_pdf_maybe_password(self, path):
-        """Open PDF with pikepdf, prompting for password if needed."""
-        try:
-            return pikepdf.open(path)
-        except pikepdf.PasswordError:
-            pwd = simpledialog.askstring("Password", "Enter current PDF password:", show="*")
-            if not pwd:
-                return None
-            try:
-                return pikepdf.open(path, password=pwd)
-            except pikepdf.PasswordError:
+    @property
+    def executor(self):
+        return self.parent.executor
+    
+    def open_pdf_maybe_password(self, path, on_opened, pwd=None):
+        """Open PDF with pikepdf in the background, prompting for password if needed."""
+        def failed(exc):
+            if not isinstance(exc, pikepdf.PasswordError):
+                messagebox.showerror("Error", f"Could not open PDF: {str(exc)}")
+                return
+            if pwd is not None:
                 messagebox.showerror("Error", "Incorrect password.")
-                return None
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not open PDF: {str(e)}")
-            return None
+                return
+            new_pwd = simpledialog.askstring("Password", "Enter current PDF password:", show="*")
+            if new_pwd:
+                self.open_pdf_maybe_password(path, on_opened, new_pwd)
+        
+        self.executor.submit(pikepdf.open, path, password=pwd or "",
+                             on_done=on_opened, on_error=failed)
     
-    def lock_pdf(self, source_path=None):
+    def lock_pdf(self, source_path=None, on_result=None):
         """Lock a PDF with password protection."""
         if not source_path:
             source_path = fd.askopenfilename(
@@ -68,19 +75,25 @@ class PDFSecurity:
             )
         
         if not source_path:
-            return False
+            return
         
-        # Check if PDF is already password protected
-        try:
+        def check_unencrypted():
             test_pdf = pikepdf.open(source_path)
             test_pdf.close()
-        except pikepdf.PasswordError:
-            messagebox.showwarning("Warning", "This PDF is already password protected.")
-            return False
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not read PDF: {str(e)}")
-            return False
         
+        def check_failed(exc):
+            if isinstance(exc, pikepdf.PasswordError):
+                messagebox.showwarning("Warning", "This PDF is already password protected.")
+            else:
+                messagebox.showerror("Error", f"Could not read PDF: {str(exc)}")
+        
+        # Check if PDF is already password protected, then continue in ask_and_lock
+        self.executor.submit(check_unencrypted,
+                             on_done=lambda _: self._ask_and_lock(source_path, on_result),
+                             on_error=check_failed)
+    
+    def _ask_and_lock(self, source_path, on_result):
+        """Ask for password and destination, then lock in the background."""
         # Get password using the dialog from parent
         if hasattr(self.parent, 'get_password_with_confirmation'):
             pwd = self.parent.get_password_with_confirmation("Lock PDF")
@@ -88,7 +101,7 @@ class PDFSecurity:
             pwd = simpledialog.askstring("Password", "Set password for PDF:", show="*")
         
         if not pwd:
-            return False
+            return
         
         # Get destination file
         dst = fd.asksaveasfilename(
@@ -97,23 +110,24 @@ class PDFSecurity:
             filetypes=[("PDF", "*.pdf")]
         )
         if not dst:
-            return False
+            return
         
-        try:
-            # Create locked PDF
-            lock_pdf_with_pikepdf(source_path, dst, pwd, pwd, build_default_permissions())
+        def locked(_):
             messagebox.showinfo("Success", f"PDF locked successfully!\nSaved as: {os.path.basename(dst)}")
             
             # Ask if user wants to open the locked PDF
-            if messagebox.askyesno("Open File", "Would you like to open the locked PDF?"):
-                return dst, pwd
-            return dst, None
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to lock PDF: {str(e)}")
-            return False
+            open_it = messagebox.askyesno("Open File", "Would you like to open the locked PDF?")
+            if on_result:
+                on_result(dst, pwd if open_it else None)
+        
+        def failed(exc):
+            messagebox.showerror("Error", f"Failed to lock PDF: {str(exc)}")
+        
+        # Create locked PDF
+        self.executor.submit(lock_pdf_with_pikepdf, source_path, dst, pwd, pwd,
+                             build_default_permissions(), on_done=locked, on_error=failed)
     
-    def unlock_pdf(self, source_path=None):
+    def unlock_pdf(self, source_path=None, on_result=None):
         """Remove password protection from a PDF."""
         if not source_path:
             source_path = fd.askopenfilename(
@@ -122,13 +136,14 @@ class PDFSecurity:
             )
         
         if not source_path:
-            return False
+            return
         
         # Try to open the PDF (will prompt for password if needed)
-        pdf = self.open_pdf_maybe_password(source_path)
-        if pdf is None:
-            return False
-        
+        self.open_pdf_maybe_password(source_path,
+                                     lambda pdf: self._save_unlocked(pdf, on_result))
+    
+    def _save_unlocked(self, pdf, on_result):
+        """Ask for a destination and save the opened PDF without encryption."""
         # Get destination file
         dst = fd.asksaveasfilename(
             title="Save unlocked PDF as...",
@@ -137,23 +152,26 @@ class PDFSecurity:
         )
         if not dst:
             pdf.close()
-            return False
+            return
         
-        try:
-            # Save without encryption
-            pdf.save(dst)
-            pdf.close()
+        def save():
+            try:
+                # Save without encryption
+                pdf.save(dst)
+            finally:
+                pdf.close()
+        
+        def unlocked(_):
             messagebox.showinfo("Success", f"PDF unlocked successfully!\nSaved as: {os.path.basename(dst)}")
             
             # Ask if user wants to open the unlocked PDF
-            if messagebox.askyesno("Open File", "Would you like to open the unlocked PDF?"):
-                return dst, None
-            return dst, None
-            
-        except Exception as e:
-            pdf.close()
-            messagebox.showerror("Error", f"Failed to unlock PDF: {str(e)}")
-            return False
+            if messagebox.askyesno("Open File", "Would you like to open the unlocked PDF?") and on_result:
+                on_result(dst, None)
+        
+        def failed(exc):
+            messagebox.showerror("Error", f"Failed to unlock PDF: {str(exc)}")
+        
+        self.executor.submit(save, on_done=unlocked, on_error=failed)
     
     def manage_permissions(self, source_path=None):
         """Manage PDF permissions - simplified for now."""
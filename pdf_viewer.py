@@ -2,27 +2,58 @@
 Main PDF Viewer application class that coordinates all components.
 """
 
+import itertools
 import os
 import tkinter as tk
-from tkinter import ttk, filedialog as fd, messagebox, simpledialog
+from tkinter import ttk, filedialog as fd, messagebox, simpledialog, colorchooser, PhotoImage
 
-from pdf_miner import PDFMiner
+from pdf_miner import PDFMiner, RenderProcess, PROFILES, DEFAULT_PROFILE, DRAFT_PROFILE
+from page_colors import NORMAL, MODES, custom_mode
 from pdf_security import PDFSecurity
 from pdf_converter import PDFConverter
+from pdf_optimizer import PDFOptimizer
+from pdf_organizer import PDFOrganizer
+from image_extractor import ImageExtractor
+from document_pool import DocumentPool
+from render_server import RemoteMiner
+from task_executor import TaskExecutor, CancelToken, PRIORITY_RENDER, PRIORITY_BACKGROUND
 from ui_components import UIManager, res
-from dialogs import PasswordDialog
+from dialogs import PasswordDialog, LibrarySearchDialog
+from library_index import LibraryIndex, DEFAULT_DB
+from interaction_trace import TraceRecorder
+
+SETTLE_MS = 250  # idle time after navigation before the final-quality re-render
+LIBRARY_SCAN_MS = 5 * 60 * 1000  # how often library folders are re-indexed
+LIBRARY_FIRST_SCAN_MS = 5000     # delay after startup before the first scan
 
 class Viewer:
     """Main PDF viewer application."""
     
-    def __init__(self, root):
+    def __init__(self, root, render_client=None):
         self.root = root
+        self.render_client = render_client
         self.setup_window()
         
         # Initialize components
+        self.executor = TaskExecutor(root, on_error=self._show_error)
+        # Pages are rasterized in worker processes (see RenderProcess), unless
+        # every render goes to a render server anyway.
+        self.renderer = None if render_client else RenderProcess()
+        if self.renderer:
+            self.renderer.start()
+        self.pool = DocumentPool(lambda path, pwd: PDFMiner(path, pwd, renderer=self.renderer))
         self.ui_manager = UIManager(root)
         self.pdf_security = PDFSecurity(self)
         self.pdf_converter = PDFConverter(self)
+        self.pdf_optimizer = PDFOptimizer(self)
+        self.pdf_organizer = PDFOrganizer(self)
+        self.image_extractor = ImageExtractor(self)
+        
+        # Render quality
+        self.quality = tk.StringVar(value=DEFAULT_PROFILE)
+        self.draft_while_scrolling = tk.BooleanVar(value=True)
+        self.page_colors = tk.StringVar(value=NORMAL)
+        self.recording = tk.BooleanVar(value=False)
         
         # Initialize UI
         self.setup_menu()
@@ -31,6 +62,13 @@ class Viewer:
         
         # Application state
         self.tabs = {}
+        self._tab_ids = itertools.count(1)
+        self.recorder = None
+        self.library = None
+        self.library_dialog = None
+        self._library_token = None
+        self._library_scanning = False
+        self.root.after(LIBRARY_FIRST_SCAN_MS, self._watch_library)
         
         # Apply initial theme
         self.ui_manager.apply_theme()
@@ -39,6 +77,7 @@ class Viewer:
         """Configure the main window."""
         self.root.title("PDF Viewer")
         self.root.geometry("1400x800")
+        self.root.protocol("WM_DELETE_WINDOW", self.exit)
         try:
             self.root.iconbitmap(res("resources/pdf_file_icon.ico"))
         except:
@@ -53,17 +92,44 @@ class Viewer:
         mf = tk.Menu(bar, tearoff=0)
         bar.add_cascade(label="File", menu=mf)
         mf.add_command(label="Open", accelerator="Ctrl+O", command=self.open_file)
+        mf.add_command(label="Library Search...", accelerator="Ctrl+Shift+F",
+                       command=self.library_search)
         mf.add_command(label="Convert to Word", command=self.pdf_converter.pdf_to_word)
         mf.add_command(label="Convert DOCX to PDF", command=self.pdf_converter.word_to_pdf)
         mf.add_separator()
-        mf.add_command(label="Exit", command=self.root.destroy)
+        mf.add_command(label="Optimize & Save", command=self.optimize_pdf)
+        mf.add_command(label="Optimize Folder...", command=self.pdf_optimizer.optimize_folder)
+        mf.add_separator()
+        mf.add_command(label="Extract Pages...", command=self.extract_pages)
+        mf.add_command(label="Split PDF...", command=self.split_pdf)
+        mf.add_command(label="Merge PDFs...", command=self.pdf_organizer.merge_pdfs)
+        mf.add_command(label="Extract Images...", command=self.extract_images)
+        mf.add_command(label="Extract Images from Folder...", command=self.image_extractor.extract_folder)
+        mf.add_separator()
+        mf.add_checkbutton(label="Record Interaction Trace", variable=self.recording,
+                           command=self.toggle_recording)
+        mf.add_separator()
+        mf.add_command(label="Exit", command=self.exit)
         
         # View menu
         mv = tk.Menu(bar, tearoff=0)
         bar.add_cascade(label="View", menu=mv)
         mv.add_checkbutton(label="Dark Mode", 
                           variable=self.ui_manager.dark, 
-                          command=self.ui_manager.apply_theme)
+                          command=self.toggle_dark_mode)
+        mc = tk.Menu(mv, tearoff=0)
+        mv.add_cascade(label="Page Colors", menu=mc)
+        for mode in MODES:
+            mc.add_radiobutton(label=mode.title(), value=mode,
+                               variable=self.page_colors, command=self._render_active)
+        mc.add_command(label="Custom...", command=self.choose_page_colors)
+        mv.add_separator()
+        mq = tk.Menu(mv, tearoff=0)
+        mv.add_cascade(label="Render Quality", menu=mq)
+        for profile in PROFILES:
+            mq.add_radiobutton(label=profile.replace("_", " ").title(), value=profile,
+                               variable=self.quality, command=self._render_active)
+        mv.add_checkbutton(label="Draft While Scrolling", variable=self.draft_while_scrolling)
     
     def setup_layout(self):
         """Setup the main window layout."""
@@ -74,7 +140,8 @@ class Viewer:
             'convert_to_word': self.pdf_converter.pdf_to_word,
             'convert_to_pdf': self.pdf_converter.word_to_pdf,
             'lock_pdf': self.lock_pdf,
-            'unlock_pdf': self.unlock_pdf
+            'unlock_pdf': self.unlock_pdf,
+            'optimize_pdf': self.optimize_pdf
         }
         
         # Control commands for right panel
@@ -99,10 +166,12 @@ class Viewer:
         
         # Bind notebook events
         self.nb.bind("<Button-3>", self._tab_menu)
+        self.nb.bind("<<NotebookTabChanged>>", self._on_tab_changed)
     
     def setup_key_bindings(self):
         """Setup keyboard shortcuts."""
         self.root.bind("<Control-o>", lambda *_: self.open_file())
+        self.root.bind("<Control-F>", lambda *_: self.library_search())
         
         key_bindings = [
             ("<Prior>", self.prev), ("<Next>", self.next),
@@ -118,11 +187,26 @@ class Viewer:
         """Get password with confirmation dialog."""
         return PasswordDialog.get_password_with_confirmation(self.root, title)
     
+    def _show_error(self, exc):
+        """Default error handler for background tasks."""
+        messagebox.showerror("Error", str(exc))
+    
+    def exit(self):
+        """Stop background work and close the application."""
+        if self._library_token:
+            self._library_token.cancel()
+        self.executor.shutdown()
+        if self.renderer:
+            self.renderer.shutdown()
+        self.root.destroy()
+    
     # File operations
     def _try_open(self, path, pwd=None):
-        """Try to open a PDF file."""
+        """Try to open a PDF file. Runs on the executor, so it must not touch Tk."""
+        if self.render_client:
+            return self._try_open_remote(path, pwd)
         try:
-            return PDFMiner(path, pwd)
+            return self.pool.acquire(path, pwd)
         except RuntimeError as e:
             if "password required" in str(e):
                 return None
@@ -133,30 +217,45 @@ class Viewer:
                         import pikepdf
                         test_pdf = pikepdf.open(path, password=pwd)
                         test_pdf.close()
-                        return PDFMiner(path, pwd)
+                        return self.pool.acquire(path, pwd)
                     return None
                 except:
                     return None
     
+    def _try_open_remote(self, path, pwd=None):
+        """Try to open a PDF file through the shared render server."""
+        try:
+            return RemoteMiner(self.render_client, path, pwd)
+        except FileNotFoundError:
+            return None
+        except RuntimeError as e:
+            if "password required" not in str(e):
+                raise
+            return None
+    
+    def open_path(self, path, pwd=None, page=0):
+        """Open a PDF in a new tab in the background, prompting for a password if needed."""
+        def opened(miner):
+            if miner:
+                self._add_tab(miner, page)
+                return
+            if pwd:
+                messagebox.showerror("Error", "Incorrect password or unreadable file.")
+                return
+            new_pwd = simpledialog.askstring("Password", "Enter PDF password:", show="*")
+            if new_pwd:
+                self.open_path(path, new_pwd, page)
+        
+        self.executor.submit(self._try_open, path, pwd, on_done=opened)
+    
     def open_file(self):
         """Open a PDF file."""
         path = fd.askopenfilename(filetypes=[("PDF", "*.pdf")])
         if not path:
             return
-        
-        miner = self._try_open(path)
-        if not miner:
-            pwd = simpledialog.askstring("Password", "Enter PDF password:", show="*")
-            if not pwd:
-                return
-            miner = self._try_open(path, pwd)
-            if not miner:
-                messagebox.showerror("Error", "Incorrect password or unreadable file.")
-                return
-        
-        self._add_tab(miner)
+        self.open_path(path)
     
-    def _add_tab(self, miner):
+    def _add_tab(self, miner, page=0):
         """Add a new tab for a PDF."""
         frm = ttk.Frame(self.nb)
         frm.columnconfigure(0, weight=1)
@@ -180,21 +279,64 @@ class Viewer:
         self.nb.select(frm)
         
         # Store tab data
-        self.tabs[frm] = dict(miner=miner, canvas=cv, page=0, zoom=1.0)
+        self.tabs[frm] = dict(miner=miner, canvas=cv, page=min(page, max(miner.pages - 1, 0)), zoom=1.0,
+                              tab_id=next(self._tab_ids))
+        self._record("open", frm, path=os.path.abspath(miner.path), page=self.tabs[frm]["page"])
         self._render(frm)
     
+    def _on_tab_changed(self, _ev=None):
+        """Reload the selected document if its file changed on disk."""
+        frm, d = self._get_active_tab()
+        if d:
+            self._record("select", frm)
+            miner = d["miner"]
+            # is_stale() stats the file, so keep it off the Tk thread.
+            self.executor.submit(self.pool.is_stale, miner,
+                                 on_done=lambda stale: stale and self._reload(miner))
+    
+    def _reload(self, old):
+        """Swap every tab showing a changed file over to a fresh handle."""
+        def reopened(new):
+            frames = [f for f, d in self.tabs.items() if d["miner"] is old]
+            if not frames:
+                self.pool.release(new)
+                return
+            for i, frm in enumerate(frames):
+                if i:
+                    self.pool.retain(new)
+                d = self.tabs[frm]
+                d["miner"] = new
+                d["page"] = min(d["page"], max(new.pages - 1, 0))
+                self.pool.release(old)
+                self._render(frm)
+        
+        self.executor.submit(self.pool.reopen, old, on_done=reopened)
+    
     def _get_active_tab(self):
         """Get the currently active tab."""
         tid = self.nb.select()
         return next(((f, d) for f, d in self.tabs.items() if str(f) == tid), (None, None))
     
-    def _render(self, frm):
-        """Render the current page of a PDF in the given frame."""
+    def _render(self, frm, profile=None):
+        """Render the current page of a PDF in the given frame on the executor."""
         d = self.tabs[frm]
+        if d.get("render_token"):
+            d["render_token"].cancel()  # a newer page/zoom supersedes it
+        
+        d["render_token"] = self.executor.submit(
+            d["miner"].render, d["page"], d["zoom"], profile=profile or self.quality.get(),
+            colors=self.page_colors.get(), priority=PRIORITY_RENDER,
+            on_done=lambda data: self._show_page(frm, data))
+    
+    def _show_page(self, frm, data):
+        """Display a finished render; runs on the Tk thread."""
+        d = self.tabs.get(frm)
+        if not d:
+            return
         cv = d["canvas"]
         cv.delete("all")
         
-        img = d["miner"].image(d["page"], d["zoom"])
+        img = PhotoImage(data=data)
         d["img"] = img
         
         cw, ch = cv.winfo_width(), cv.winfo_height()
@@ -204,13 +346,41 @@ class Viewer:
         cv.configure(scrollregion=cv.bbox("all"))
         self.page_lbl.config(text=f"{d['page'] + 1}/{d['miner'].pages}")
     
+    def _render_active(self):
+        """Re-render the active tab, e.g. after the quality profile or page colours changed."""
+        frm, d = self._get_active_tab()
+        if d:
+            self._render(frm)
+    
+    def _render_interactive(self, frm):
+        """Render in draft quality now and in the selected quality once input settles."""
+        # Each tab settles on its own, so input in another tab never drops this one's final render.
+        d = self.tabs[frm]
+        if d.get("settle_job"):
+            self.root.after_cancel(d["settle_job"])
+            d["settle_job"] = None
+        
+        if not self.draft_while_scrolling.get() or self.quality.get() != DEFAULT_PROFILE:
+            self._render(frm)
+            return
+        
+        self._render(frm, DRAFT_PROFILE)
+        
+        def settle():
+            if frm in self.tabs:
+                self.tabs[frm]["settle_job"] = None
+                self._render(frm)
+        
+        d["settle_job"] = self.root.after(SETTLE_MS, settle)
+    
     # Navigation
     def _shift(self, delta):
         """Move to next/previous page."""
         frm, d = self._get_active_tab()
         if d and 0 <= d["page"] + delta < d["miner"].pages:
             d["page"] += delta
-            self._render(frm)
+            self._record("shift", frm, delta=delta)
+            self._render_interactive(frm)
     
     def next(self):
         """Go to next page."""
@@ -231,6 +401,7 @@ class Viewer:
             return
         if 0 <= tgt < d["miner"].pages:
             d["page"] = tgt
+            self._record("jump", frm, page=tgt)
             self._render(frm)
     
     # Zoom
@@ -239,7 +410,8 @@ class Viewer:
         frm, d = self._get_active_tab()
         if d:
             d["zoom"] *= factor
-            self._render(frm)
+            self._record("zoom", frm, factor=factor)
+            self._render_interactive(frm)
     
     def zoom_in(self):
         """Zoom in."""
@@ -249,31 +421,157 @@ class Viewer:
         """Zoom out."""
         self._zoom(1 / 1.1)
     
+    # Interaction traces
+    def _record(self, action, frm, **args):
+        """Add an action on the given tab to the trace being recorded, if any."""
+        if self.recorder:
+            self.recorder.record(action, tab=self.tabs[frm]["tab_id"], **args)
+    
+    def toggle_dark_mode(self):
+        """Apply the theme and switch page colours between normal and inverted with it."""
+        self.ui_manager.apply_theme()
+        dark, colors = self.ui_manager.dark.get(), self.page_colors.get()
+        if dark and colors == NORMAL:
+            self.page_colors.set("invert")
+        elif not dark and colors == "invert":
+            self.page_colors.set(NORMAL)
+        else:
+            return  # sepia or custom colours were chosen explicitly
+        self._render_active()
+    
+    def choose_page_colors(self):
+        """Pick custom text and background colours for the pages."""
+        fg = colorchooser.askcolor(title="Text color", color="#e0e0e0")[1]
+        if not fg:
+            return
+        bg = colorchooser.askcolor(title="Background color", color="#1e1e1e")[1]
+        if not bg:
+            return
+        self.page_colors.set(custom_mode(fg, bg))
+        self._render_active()
+    
+    def toggle_recording(self):
+        """Start recording an interaction trace, or stop and save it."""
+        if self.recording.get():
+            self.recorder = TraceRecorder()
+            return
+        
+        recorder, self.recorder = self.recorder, None
+        if not recorder or not recorder.events:
+            return
+        path = fd.asksaveasfilename(title="Save interaction trace as...",
+                                    defaultextension=".json",
+                                    filetypes=[("Trace", "*.json")])
+        if path:
+            try:
+                recorder.save(path)
+            except OSError as e:
+                messagebox.showerror("Error", str(e))
+    
+    # Library
+    def _open_library(self, then, create=True):
+        """Open the library index in the background, then call then(library) on the Tk thread.
+
+        With create=False nothing happens unless an index already exists.
+        """
+        if self.library is not None:
+            then(self.library)
+            return
+        
+        def open_index():
+            if not create and not os.path.exists(DEFAULT_DB):
+                return None
+            return LibraryIndex()
+        
+        def opened(library):
+            if library is None:
+                return
+            if self.library is None:
+                self.library = library
+            then(self.library)
+        
+        def failed(e):
+            if create:
+                messagebox.showerror("Error", f"Could not open library index: {str(e)}")
+        
+        self.executor.submit(open_index, on_done=opened, on_error=failed)
+    
+    def library_search(self):
+        """Show the library search panel."""
+        if self.library_dialog and self.library_dialog.top.winfo_exists():
+            self.library_dialog.top.lift()
+            return
+        
+        def show(library):
+            if not (self.library_dialog and self.library_dialog.top.winfo_exists()):
+                self.library_dialog = LibrarySearchDialog(self.root, library, self.executor,
+                                                          self.open_path)
+        
+        self._open_library(show)
+    
+    def _watch_library(self):
+        """Periodically pick up new and changed files in the library folders."""
+        def finished(_):
+            self._library_scanning = False
+        
+        def scan(library):
+            # update() waits for a re-index from the search panel, so don't queue
+            # another periodic scan behind one that hasn't finished yet.
+            if self._library_scanning:
+                return
+            self._library_scanning = True
+            token = self._library_token = CancelToken()
+            self.executor.submit(lambda: library.update(token=token), token=token,
+                                 priority=PRIORITY_BACKGROUND, on_done=finished, on_error=finished)
+        
+        self._open_library(scan, create=False)
+        self.root.after(LIBRARY_SCAN_MS, self._watch_library)
+    
     # Security operations
     def lock_pdf(self):
         """Lock a PDF file."""
         frm, d = self._get_active_tab()
         source_path = d["miner"].path if d else None
         
-        result = self.pdf_security.lock_pdf(source_path)
-        if result and len(result) == 2:
-            dst_path, pwd = result
+        def locked(dst_path, pwd):
             if pwd:  # User wants to open the locked file
-                miner = self._try_open(dst_path, pwd)
-                if miner:
-                    self._add_tab(miner)
+                self.open_path(dst_path, pwd)
+        
+        self.pdf_security.lock_pdf(source_path, on_result=locked)
     
     def unlock_pdf(self):
         """Unlock a PDF file."""
         frm, d = self._get_active_tab()
         source_path = d["miner"].path if d else None
         
-        result = self.pdf_security.unlock_pdf(source_path)
-        if result and len(result) == 2:
-            dst_path, _ = result
-            miner = self._try_open(dst_path)
-            if miner:
-                self._add_tab(miner)
+        def unlocked(dst_path, pwd):
+            self.open_path(dst_path)
+        
+        self.pdf_security.unlock_pdf(source_path, on_result=unlocked)
+    
+    def optimize_pdf(self):
+        """Optimize the current (or a chosen) PDF and save a copy."""
+        frm, d = self._get_active_tab()
+        source_path = d["miner"].path if d else None
+        self.pdf_optimizer.optimize_pdf(source_path)
+    
+    def extract_pages(self):
+        """Extract pages from the current (or a chosen) PDF."""
+        frm, d = self._get_active_tab()
+        source_path = d["miner"].path if d else None
+        self.pdf_organizer.extract_pages(source_path)
+    
+    def split_pdf(self):
+        """Split the current (or a chosen) PDF into several files."""
+        frm, d = self._get_active_tab()
+        source_path = d["miner"].path if d else None
+        self.pdf_organizer.split_pdf(source_path)
+    
+    def extract_images(self):
+        """Extract the embedded images of the current (or a chosen) PDF."""
+        frm, d = self._get_active_tab()
+        source_path = d["miner"].path if d else None
+        self.image_extractor.extract_images(source_path)
     
     def manage_permissions(self):
         """Manage PDF permissions."""
@@ -322,11 +620,21 @@ class Viewer:
         m.add_command(label="Unlock PDF", command=self.unlock_pdf)
         m.add_separator()
         m.add_command(label="Manage Permissions", command=self.manage_permissions)
+        m.add_command(label="Optimize & Save", command=self.optimize_pdf)
+        m.add_separator()
+        m.add_command(label="Extract Pages...", command=self.extract_pages)
+        m.add_command(label="Split PDF...", command=self.split_pdf)
+        m.add_command(label="Extract Images...", command=self.extract_images)
         m.tk_popup(ev.x_root, ev.y_root)
     
     def _close_tab(self, frm):
         """Close a tab."""
         if frm in self.tabs:
-            self.tabs[frm]["miner"].close()  # Clean up PDF resources
+            self._record("close", frm)
+            if self.tabs[frm].get("render_token"):
+                self.tabs[frm]["render_token"].cancel()
+            if self.tabs[frm].get("settle_job"):
+                self.root.after_cancel(self.tabs[frm]["settle_job"])
+            self.pool.release(self.tabs[frm]["miner"])  # Closed when no other tab uses it
             self.nb.forget(frm)
             self.tabs.pop(frm, None)
@@ -0,0 +1,84 @@
+"""
+Bounded, thread-safe LRU cache for rendered pages and other derived data.
+"""
+
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+class RenderCache:
+    """LRU cache bounded by the total size of its entries in bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None, count=True):
+        """Return the cached value for key, marking it most recently used.
+
+        With count=False the lookup is left out of the hit/miss statistics, for
+        callers that report the outcome themselves through record().
+        """
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += count
+                return default
+            self._items.move_to_end(key)
+            self.hits += count
+            return entry[0]
+
+    def record(self, hit):
+        """Count one lookup as a hit or a miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, value, size=None):
+        """Store a value; size defaults to len(value) for bytes-like values."""
+        if size is None:
+            size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.bytes -= evicted
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                self.bytes -= self._items.pop(key)[1]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return dict(entries=len(self._items), bytes=self.bytes,
+                        max_bytes=self.max_bytes, hits=self.hits, misses=self.misses)
@@ -0,0 +1,550 @@
+"""
+Local render server that shares one render cache and document pool across clients.
+
+Run headless with ``python main.py --serve`` (or ``python render_server.py``) and point
+other tools, or the viewer itself via ``python main.py --server URL``, at it.
+
+Only PDF files under the served root folders (default: the user's home folder,
+``--root`` to change) are opened, and the server refuses to bind to anything
+but a loopback address unless ``--allow-remote`` is given. Zoom must lie in
+(0, MAX_ZOOM] and a render may not exceed MAX_RENDER_PIXELS.
+
+Endpoints (all GET):
+    /render?path=...&page=N&zoom=F[&fmt=ppm|png][&profile=final|draft|...]
+            [&colors=normal|invert|sepia|custom:#RRGGBB:#RRGGBB][&pwd=...]
+    /text?path=...&page=N[&pwd=...]                          page text (UTF-8)
+    /meta?path=...[&pwd=...]                                 document metadata (JSON)
+    /stats                                                   cache and latency metrics (JSON)
+"""
+
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from tkinter import PhotoImage
+
+import fitz
+import pikepdf
+
+from document_pool import fingerprint
+from page_colors import NORMAL
+from pdf_miner import PDFMiner, PROFILES, DEFAULT_PROFILE, FITZ_LOCK, recolor
+from render_cache import RenderCache, DEFAULT_CACHE_BYTES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_OPEN_DOCS = 16
+MAX_ZOOM = 8.0
+MAX_RENDER_PIXELS = 25_000_000  # ~75 MB as RGB; larger rasters are refused
+DEFAULT_ROOTS = (os.path.expanduser("~"),)
+LATENCY_WINDOW = 1000
+
+class _Call:
+    """A single in-flight computation that other callers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class Coalescer:
+    """Collapses concurrent calls with the same key into one computation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def run(self, key, fn):
+        """Run fn() once per key at a time; concurrent callers share its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+class LatencyStats:
+    """Per-endpoint request latency recorder with percentile summaries."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, endpoint, seconds):
+        """Record one request latency for endpoint."""
+        with self._lock:
+            self._samples.setdefault(endpoint, deque(maxlen=self._window)).append(seconds)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    def summary(self):
+        """Return count and p50/p95/p99/max latency (ms) for every endpoint."""
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self._samples.items()}
+            counts = dict(self._counts)
+
+        def pct(values, q):
+            return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+        return {
+            endpoint: dict(count=counts[endpoint],
+                           p50_ms=pct(values, 0.50),
+                           p95_ms=pct(values, 0.95),
+                           p99_ms=pct(values, 0.99),
+                           max_ms=values[-1] * 1000)
+            for endpoint, values in snapshot.items()
+        }
+
+def is_loopback(host):
+    """True if host resolves to a loopback address."""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+def _digest(pwd):
+    return hashlib.sha256((pwd or "").encode("utf-8")).hexdigest()
+
+def _needs_password(path):
+    """True if the document cannot be read without a password."""
+    try:
+        with fitz.open(path) as doc:
+            return doc.needs_pass
+    except Exception:
+        return True  # only readable through PDFMiner's pikepdf fallback, i.e. with a password
+
+def _check_password(path, pwd):
+    """True if pwd opens the encrypted document at path."""
+    with fitz.open(path) as doc:
+        if doc.authenticate(pwd):
+            return True
+    try:
+        pikepdf.open(path, password=pwd).close()
+        return True
+    except pikepdf.PasswordError:
+        return False
+
+class HandlePool:
+    """Keeps a bounded number of PDFMiner handles open, closing the least recently used.
+
+    Handles are keyed by file fingerprint, so a file that changes on disk is reopened.
+    An evicted handle stays open until the last request using it has finished.
+    Handles and cached results are shared between clients, so every request for
+    an encrypted document must present a password that opens it.
+    """
+
+    def __init__(self, max_open=MAX_OPEN_DOCS):
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._opening = Coalescer()
+        self._entries = OrderedDict()  # fingerprint -> entry
+
+    def _open(self, key, pwd):
+        with open(key[0], "rb") as f:
+            if b"%PDF-" not in f.read(1024):
+                raise ValueError("not a PDF file")
+        # The server's shared RenderCache replaces the per-document one.
+        miner = PDFMiner(key[0], pwd, cache_bytes=0)
+        encrypted = _needs_password(key[0])
+        return dict(fingerprint=key, miner=miner, users=0, evicted=False, encrypted=encrypted,
+                    passwords={_digest(pwd)} if encrypted else set())
+
+    def _acquire(self, path, pwd):
+        key = fingerprint(path)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry["users"] += 1
+                    return entry
+
+            opened = self._opening.run(key, lambda: self._open(key, pwd))
+            with self._lock:
+                if key in self._entries or opened["evicted"]:
+                    continue  # a coalesced caller registered it first, or it is already gone
+                evicted = [self._entries.pop(k) for k in list(self._entries) if k[0] == key[0]]
+                self._entries[key] = opened
+                while len(self._entries) > self.max_open:
+                    evicted.append(self._entries.popitem(last=False)[1])
+                opened["users"] += 1
+                for old in evicted:
+                    old["evicted"] = True
+                idle = [old for old in evicted if old["users"] == 0]
+            for old in idle:
+                old["miner"].close()
+            return opened
+
+    def _release(self, entry):
+        with self._lock:
+            entry["users"] -= 1
+            close = entry["evicted"] and entry["users"] == 0
+        if close:
+            entry["miner"].close()
+
+    def _authorize(self, entry, pwd):
+        """Raise unless pwd opens the entry's document (or it is not encrypted)."""
+        if not entry["encrypted"]:
+            return
+        digest = _digest(pwd)
+        with self._lock:
+            if digest in entry["passwords"]:
+                return
+        # A different password may still be valid (e.g. the owner password).
+        if pwd and _check_password(entry["fingerprint"][0], pwd):
+            with self._lock:
+                entry["passwords"].add(digest)
+            return
+        raise RuntimeError("password required")
+
+    @contextmanager
+    def use(self, path, pwd=None):
+        """Yield (fingerprint, PDFMiner) for path, opening it on first use.
+
+        Raises RuntimeError("password required") if the document is encrypted and
+        pwd does not open it, even when another client already opened it.
+        """
+        entry = self._acquire(path, pwd)
+        try:
+            self._authorize(entry, pwd)
+            yield entry["fingerprint"], entry["miner"]
+        finally:
+            self._release(entry)
+
+    def close_all(self):
+        """Close every pooled handle; handles still in use close when their request ends."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            for entry in entries:
+                entry["evicted"] = True
+            idle = [entry for entry in entries if entry["users"] == 0]
+        for entry in idle:
+            entry["miner"].close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+class RenderServer:
+    """Serves page renders, text and metadata from a shared cache over localhost HTTP."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 cache_bytes=DEFAULT_CACHE_BYTES, max_open=MAX_OPEN_DOCS,
+                 roots=DEFAULT_ROOTS, allow_remote=False):
+        if not allow_remote and not is_loopback(host):
+            raise ValueError(f"refusing to serve on non-loopback host {host!r} "
+                             "without allow_remote")
+        self.roots = [os.path.realpath(root) for root in roots]
+        self.cache = RenderCache(cache_bytes)
+        self.pool = HandlePool(max_open)
+        self.coalescer = Coalescer()
+        self.latency = LatencyStats()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL clients should connect to."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    # Request handling
+    def _handle(self, req):
+        """Dispatch one request and record its latency."""
+        start = time.perf_counter()
+        url = urllib.parse.urlsplit(req.path)
+        endpoint = url.path.strip("/") or "stats"
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+        status, ctype, body, source = 200, "application/json", b"", "-"
+
+        try:
+            if endpoint == "render":
+                body, source = self.render(params["path"], int(params["page"]),
+                                           float(params.get("zoom", 1.0)),
+                                           params.get("fmt", "ppm"), params.get("pwd"),
+                                           params.get("profile", DEFAULT_PROFILE),
+                                           params.get("colors", NORMAL))
+                ctype = "image/png" if params.get("fmt") == "png" else "image/x-portable-pixmap"
+            elif endpoint == "text":
+                body, source = self.text(params["path"], int(params["page"]), params.get("pwd"))
+                ctype = "text/plain; charset=utf-8"
+            elif endpoint == "meta":
+                body, source = self.metadata(params["path"], params.get("pwd"))
+            elif endpoint == "stats":
+                body = json.dumps(self.stats()).encode()
+            else:
+                status, body = 404, b'{"error": "unknown endpoint"}'
+        except (KeyError, ValueError, IndexError) as e:
+            status, body = 400, json.dumps({"error": f"bad request: {e}"}).encode()
+        except FileNotFoundError as e:
+            status, body = 404, json.dumps({"error": str(e)}).encode()
+        except PermissionError as e:
+            status, body = 403, json.dumps({"error": str(e)}).encode()
+        except RuntimeError as e:
+            status = 401 if "password required" in str(e) else 500
+            body = json.dumps({"error": str(e)}).encode()
+        except Exception as e:
+            status, body = 500, json.dumps({"error": str(e)}).encode()
+
+        elapsed = time.perf_counter() - start
+        self.latency.record(endpoint, elapsed)
+
+        req.send_response(status)
+        req.send_header("Content-Type", ctype)
+        req.send_header("Content-Length", str(len(body)))
+        req.send_header("X-Cache", source)
+        req.send_header("X-Elapsed-Ms", f"{elapsed * 1000:.2f}")
+        req.end_headers()
+        req.wfile.write(body)
+
+    def _cached(self, key, compute):
+        """Return (value, source) for key, computing it at most once concurrently.
+
+        Requests that share another request's computation count as cache hits.
+        """
+        value = self.cache.get(key, count=False)
+        if value is not None:
+            self.cache.record(hit=True)
+            return value, "hit"
+
+        computed = []
+
+        def fill():
+            computed.append(True)
+            result = compute()
+            self.cache.put(key, result)
+            return result
+
+        value = self.coalescer.run(key, fill)
+        self.cache.record(hit=not computed)
+        return value, "miss" if computed else "coalesced"
+
+    def _document(self, path, pwd):
+        """Hold a pooled handle for the duration of one request."""
+        real = os.path.realpath(path)
+        if not real.lower().endswith(".pdf"):
+            raise PermissionError("only PDF files are served")
+        if not any(os.path.commonpath([real, root]) == root for root in self.roots):
+            raise PermissionError(f"{path} is outside the served folders")
+        if not os.path.isfile(real):
+            raise FileNotFoundError(f"no such file: {path}")
+        return self.pool.use(real, pwd)
+
+    def render(self, path, page, zoom=1.0, fmt="ppm", pwd=None, profile=DEFAULT_PROFILE,
+               colors=NORMAL):
+        """Return (image bytes, cache source) for a page render."""
+        if profile not in PROFILES:
+            raise ValueError(f"unknown profile {profile!r}")
+        if not 0 < zoom <= MAX_ZOOM:  # also rejects NaN
+            raise ValueError(f"zoom must be in (0, {MAX_ZOOM}]")
+        if page < 0:
+            raise ValueError("page must not be negative")
+        if colors != NORMAL:
+            # Tint the shared plain render so every colour mode reuses one rasterization.
+            with self._document(path, pwd) as (fp, _):
+                key = ("render", fp, page, round(zoom, 4), profile, fmt, colors)
+                return self._cached(key, lambda: recolor(
+                    self.render(path, page, zoom, "ppm", pwd, profile)[0], colors, fmt))
+        with self._document(path, pwd) as (fp, miner):
+            self._check_raster(miner, page, zoom, profile)
+            key = ("render", fp, page, round(zoom, 4), profile, fmt)
+            return self._cached(key, lambda: miner.render(page, zoom, fmt, profile))
+
+    @staticmethod
+    def _check_raster(miner, page, zoom, profile):
+        """Refuse renders whose raster would exceed MAX_RENDER_PIXELS."""
+        with FITZ_LOCK:
+            rect = miner.doc[page].rect
+        opts = PROFILES[profile]
+        if opts["upscale"]:
+            opts = dict(opts, max_px=None)  # the capped draft is stretched back up
+        mat = miner._matrix(rect, zoom, opts)
+        pixels = rect.width * mat.a * rect.height * mat.d
+        if pixels > MAX_RENDER_PIXELS:
+            raise ValueError(f"raster of {pixels / 1e6:.0f} Mpx exceeds the "
+                             f"{MAX_RENDER_PIXELS / 1e6:.0f} Mpx limit")
+
+    def text(self, path, page, pwd=None):
+        """Return (UTF-8 text bytes, cache source) for a page."""
+        if page < 0:
+            raise ValueError("page must not be negative")
+        with self._document(path, pwd) as (fp, miner):
+            return self._cached(("text", fp, page), lambda: miner.text(page).encode("utf-8"))
+
+    def metadata(self, path, pwd=None):
+        """Return (JSON metadata bytes, cache source) for a document."""
+        with self._document(path, pwd) as (fp, miner):
+            return self._cached(("meta", fp), lambda: json.dumps(miner.metadata).encode())
+
+    def stats(self):
+        """Return cache, pool, coalescing and latency metrics."""
+        return dict(cache=self.cache.stats(),
+                    open_documents=len(self.pool),
+                    coalesced=self.coalescer.coalesced,
+                    latency=self.latency.summary())
+
+    # Lifecycle
+    def serve_forever(self):
+        """Serve requests on the calling thread until shutdown()."""
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Serve requests on a background daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        """Stop serving and release all document handles."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.pool.close_all()
+
+class RenderClient:
+    """Minimal HTTP client for a RenderServer."""
+
+    def __init__(self, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _get(self, endpoint, **params):
+        params = {k: v for k, v in params.items() if v is not None}
+        query = urllib.parse.urlencode(params)
+        try:
+            with urllib.request.urlopen(f"{self.url}/{endpoint}?{query}", timeout=self.timeout) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as e:
+            try:
+                msg = json.loads(e.read()).get("error", str(e))
+            except Exception:
+                msg = str(e)
+            if e.code == 404:
+                raise FileNotFoundError(msg) from e
+            if e.code == 403:
+                raise PermissionError(msg) from e
+            raise RuntimeError(msg) from e
+        except urllib.error.URLError as e:
+            raise RuntimeError(f"render server unavailable: {e.reason}") from e
+
+    def render(self, path, page, zoom=1.0, fmt="ppm", pwd=None, profile=DEFAULT_PROFILE,
+               colors=NORMAL):
+        """Fetch an encoded page image."""
+        return self._get("render", path=path, page=page, zoom=zoom, fmt=fmt, pwd=pwd,
+                         profile=profile, colors=colors)
+
+    def text(self, path, page, pwd=None):
+        """Fetch the plain text of a page."""
+        return self._get("text", path=path, page=page, pwd=pwd).decode("utf-8")
+
+    def metadata(self, path, pwd=None):
+        """Fetch document metadata."""
+        return json.loads(self._get("meta", path=path, pwd=pwd))
+
+    def stats(self):
+        """Fetch server metrics."""
+        return json.loads(self._get("stats"))
+
+class RemoteMiner:
+    """PDFMiner stand-in that renders through a RenderServer, for use in viewer tabs."""
+
+    def __init__(self, client, path, pwd=None):
+        self.client = client
+        self.path = os.path.abspath(path)
+        self.pwd = pwd
+        meta = client.metadata(self.path, pwd)
+        self._pages = meta["pages"]
+        self.base_zoom = meta["base_zoom"]
+
+    @property
+    def pages(self):
+        """Return the total number of pages in the PDF."""
+        return self._pages
+
+    def render(self, pno, factor=1.0, fmt="ppm", profile=DEFAULT_PROFILE, colors=NORMAL):
+        """Fetch the rendered page as encoded image bytes."""
+        return self.client.render(self.path, pno, factor, fmt, self.pwd, profile, colors)
+
+    def image(self, pno, factor=1.0, profile=DEFAULT_PROFILE, colors=NORMAL):
+        """Generate a PhotoImage for the specified page number with zoom factor."""
+        return PhotoImage(data=self.render(pno, factor, profile=profile, colors=colors))
+
+    def text(self, pno):
+        """Return the plain text of the specified page."""
+        return self.client.text(self.path, pno, self.pwd)
+
+    def close(self):
+        """Nothing to release locally; the server owns the document handle."""
+
+def main(argv=None):
+    """Run the render server in the foreground."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Shared PDF render server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--allow-remote", action="store_true",
+                        help="allow binding --host to a non-loopback address")
+    parser.add_argument("--root", action="append", default=None, metavar="DIR",
+                        help="folder whose PDFs may be served (repeatable; default: home folder)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024))
+    parser.add_argument("--max-open", type=int, default=MAX_OPEN_DOCS)
+    args = parser.parse_args(argv)
+
+    if args.allow_remote and not is_loopback(args.host):
+        print(f"WARNING: serving on {args.host}; anyone who can reach this port can read "
+              "the PDFs under the served folders.", file=sys.stderr)
+    server = RenderServer(args.host, args.port, args.cache_mb * 1024 * 1024, args.max_open,
+                          args.root or DEFAULT_ROOTS, args.allow_remote)
+    print(f"Render server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
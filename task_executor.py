@@ -0,0 +1,137 @@
+"""
+Shared background executor that hands results back to the Tk main loop.
+
+Worker threads must never touch Tk. Callbacks passed to submit() are queued and
+run on the main thread by a drain loop scheduled with root.after().
+
+Threads only keep the window responsive for work that releases the GIL (I/O,
+waiting on a process pool). PyMuPDF holds it while rasterizing, so page renders
+go through pdf_miner.RenderProcess and CPU-heavy batch jobs use process pools.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+
+PRIORITY_RENDER = 0        # visible page renders
+PRIORITY_INTERACTIVE = 10  # opens, lock/unlock and other user-initiated work
+PRIORITY_BACKGROUND = 20   # conversions and batch jobs
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)      # renders and interactive work
+BACKGROUND_WORKERS = max(1, DEFAULT_WORKERS // 2)   # PRIORITY_BACKGROUND and lower
+POLL_MS = 10
+DRAIN_BUDGET = 0.008  # seconds of callbacks per drain before yielding to Tk
+
+class Cancelled(Exception):
+    """Raised inside a task that noticed its token was cancelled."""
+
+class CancelToken:
+    """Cooperative cancellation flag shared between the UI and a task."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Request cancellation; queued tasks are skipped and callbacks dropped."""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """Abort a long-running task at a convenient checkpoint."""
+        if self._event.is_set():
+            raise Cancelled()
+
+class TaskExecutor:
+    """Bounded, prioritized worker pool with main-loop result dispatch.
+
+    Background jobs run on their own workers, so a long conversion, batch job or
+    library scan can never hold up page renders and file opens.
+    """
+
+    def __init__(self, root, workers=DEFAULT_WORKERS, on_error=None, poll_ms=POLL_MS,
+                 background_workers=BACKGROUND_WORKERS):
+        self.root = root
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self._tasks = queue.PriorityQueue()
+        self._background = queue.PriorityQueue()
+        self._results = queue.Queue()
+        self._seq = itertools.count()
+        self._stopped = False
+        self._workers = [threading.Thread(target=self._work, args=(self._tasks,), daemon=True,
+                                          name=f"executor-{i}")
+                         for i in range(workers)]
+        self._background_workers = [threading.Thread(target=self._work, args=(self._background,),
+                                                     daemon=True, name=f"background-{i}")
+                                    for i in range(background_workers)]
+        for worker in self._workers + self._background_workers:
+            worker.start()
+        self._drain_job = root.after(poll_ms, self._drain)
+
+    def submit(self, fn, *args, priority=PRIORITY_INTERACTIVE, on_done=None,
+               on_error=None, token=None, **kwargs):
+        """Run fn(*args, **kwargs) on a worker; on_done/on_error run on the Tk thread.
+
+        Returns the task's CancelToken (a new one unless token is given).
+        """
+        token = token or CancelToken()
+        tasks = self._background if priority >= PRIORITY_BACKGROUND else self._tasks
+        tasks.put((priority, next(self._seq), (fn, args, kwargs, on_done, on_error, token)))
+        return token
+
+    def call_in_ui(self, fn, *args):
+        """Schedule fn(*args) on the Tk thread; safe to call from workers (e.g. progress)."""
+        self._results.put((fn, args, None))
+
+    def _work(self, tasks):
+        while True:
+            _, _, task = tasks.get()
+            if task is None:
+                return
+            fn, args, kwargs, on_done, on_error, token = task
+            if token.cancelled:
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except Cancelled:
+                continue
+            except Exception as e:
+                self._results.put((on_error or self.on_error, (e,), token))
+            else:
+                if on_done:
+                    self._results.put((on_done, (result,), token))
+
+    def _drain(self):
+        """Run queued callbacks on the Tk thread within a small time budget."""
+        deadline = time.perf_counter() + DRAIN_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                fn, args, token = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if fn is None or (token is not None and token.cancelled):
+                continue
+            try:
+                fn(*args)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+        if not self._stopped:
+            self._drain_job = self.root.after(self.poll_ms, self._drain)
+
+    def shutdown(self):
+        """Stop the drain loop and let workers exit after their current task."""
+        self._stopped = True
+        try:
+            self.root.after_cancel(self._drain_job)
+        except Exception:
+            pass
+        for tasks, workers in ((self._tasks, self._workers),
+                               (self._background, self._background_workers)):
+            for _ in workers:
+                tasks.put((float("inf"), next(self._seq), None))
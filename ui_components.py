@@ -91,7 +91,8 @@ class UIManager:
             ("Convert to Word", button_commands['convert_to_word']),
             ("Convert DOCX➜PDF", button_commands['convert_to_pdf']),
             ("Lock PDF", button_commands['lock_pdf']),
-            ("Unlock PDF", button_commands['unlock_pdf'])
+            ("Unlock PDF", button_commands['unlock_pdf']),
+            ("Optimize PDF", button_commands['optimize_pdf'])
         ]
         
         for r, (txt, cmd) in enumerate(buttons, 1):